@@ -1,32 +1,67 @@
-from flask import Flask, render_template, request, redirect, flash, session
+from flask import Flask, render_template, request, redirect, flash, session, g, url_for, abort, Response
 from werkzeug.security import check_password_hash
 from dotenv import load_dotenv
 from urllib.parse import unquote
+from xml.sax.saxutils import escape
 from werkzeug.security import generate_password_hash
-from openpyxl import Workbook
+from openpyxl import Workbook, load_workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+from openpyxl.utils import get_column_letter
 from flask import send_file
 from io import BytesIO
-import oracledb
 import qrcode
+from qrcode.image.svg import SvgPathImage
 import os
+import base64
+import bisect
+import cProfile
+import csv
+import functools
+import io
+import hashlib
+import json
+import multiprocessing
+import pstats
+import queue
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+import unicodedata
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
 from io import BytesIO
 
 from flask import send_file
 
 from reportlab.platypus import (
-    SimpleDocTemplate,
     Table,
     TableStyle,
-    Paragraph,
-    Spacer
+    Paragraph
 )
 
 from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
 from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib.units import inch
+from reportlab.lib.units import inch, mm
 from flask import jsonify
 from urllib.parse import unquote
 
+from repository import (
+    MARK_DUPLICATE,
+    MARK_MARKED,
+    MARK_NOT_FOUND,
+    QueryStats,
+    create_backend,
+    stream_fetch_ms
+)
+
 # Load environment variables
 load_dotenv()
 
@@ -34,1347 +69,4643 @@ app = Flask(__name__)
 app.secret_key = os.getenv("SECRET_KEY")
 
 
+# -----------------------------
+# Database Backend
+# -----------------------------
+# DB_BACKEND selects Oracle (default) or the embedded SQLite
+# backend; routes and background jobs only talk to the Repository
+# from repository.py, which times every statement by name.
+# Statements at or over SLOW_QUERY_MS are logged with their binds
+# redacted; 0 turns the slow-query log off.
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "500"))
+
+query_stats = QueryStats(slow_ms=SLOW_QUERY_MS, logger=app.logger)
+db_backend = create_backend(stats=query_stats)
+
+# Counters kept alongside the pool so /metrics/pool can show
+# how long requests wait for a session under load.
+_pool_stats = {
+    "acquired": 0,
+    "released": 0,
+    "waiting": 0,
+    "timeouts": 0,
+    "wait_ms_total": 0.0,
+    "wait_ms_max": 0.0
+}
+_pool_stats_lock = threading.Lock()
+
+
 # -----------------------------
 # Database Connection
+# (one pooled session per request)
 # -----------------------------
 def get_db():
-    dsn = oracledb.makedsn(
-        os.getenv("DB_HOST"),
-        int(os.getenv("DB_PORT")),
-        service_name=os.getenv("DB_SERVICE")
-    )
 
-    return oracledb.connect(
-        user=os.getenv("DB_USER"),
-        password=os.getenv("DB_PASSWORD"),
-        dsn=dsn
-    )
+    if "db" not in g:
 
+        with _pool_stats_lock:
+            _pool_stats["waiting"] += 1
 
-# -----------------------------
-# Home Page / Dashboard
-# -----------------------------
-@app.route("/")
-def index():
+        start = time.perf_counter()
 
-    # Check login
-    if "admin" not in session:
-        return redirect("/login")
+        try:
 
-    conn = None
-    cur = None
+            g.db = db_backend.connect()
 
-    try:
+        except Exception as e:
 
-        conn = get_db()
-        cur = conn.cursor()
+            if db_backend.is_pool_timeout(e):
 
-        # -----------------------------
-        # Total Students
-        # -----------------------------
-        cur.execute("""
-            SELECT COUNT(*)
-            FROM students
-        """)
+                with _pool_stats_lock:
+                    _pool_stats["timeouts"] += 1
 
-        total_students = cur.fetchone()[0]
+            raise
 
-        # -----------------------------
-        # Total Attendance Records
-        # -----------------------------
-        cur.execute("""
-            SELECT COUNT(*)
-            FROM attendance
-        """)
+        finally:
 
-        total_attendance = cur.fetchone()[0]
+            waited = (time.perf_counter() - start) * 1000
 
-        # -----------------------------
-        # Today's Attendance
-        # -----------------------------
-        cur.execute("""
-            SELECT COUNT(*)
-            FROM attendance
-            WHERE TRUNC(date_attended) = TRUNC(SYSDATE)
-        """)
+            acquire_stats.record(db_backend.name, waited)
 
-        today_attendance = cur.fetchone()[0]
+            with _pool_stats_lock:
 
-        # -----------------------------
-        # Attendance Percentage
-        # -----------------------------
-        if total_students > 0:
+                _pool_stats["waiting"] -= 1
+                _pool_stats["wait_ms_total"] += waited
 
-            attendance_percentage = round(
+                if waited > _pool_stats["wait_ms_max"]:
+                    _pool_stats["wait_ms_max"] = waited
 
-                (today_attendance / total_students) * 100,
+        with _pool_stats_lock:
+            _pool_stats["acquired"] += 1
 
-                2
+    return g.db
 
-            )
 
-        else:
+def get_repo():
 
-            attendance_percentage = 0
+    if "repo" not in g:
 
-        # -----------------------------
-        # Recent Attendance
-        # -----------------------------
-        cur.execute("""
-            SELECT
-                s.name,
-                s.usn,
-                a.date_attended,
-                a.status
-            FROM students s
-            JOIN attendance a
-                ON s.student_id = a.student_id
-            ORDER BY a.date_attended DESC
-            FETCH FIRST 5 ROWS ONLY
-        """)
-
-        recent = cur.fetchall()
+        g.repo = db_backend.repository(get_db())
 
-        # -----------------------------
-        # Monthly Attendance Data
-        # (Last 6 Months)
-        # -----------------------------
-        cur.execute("""
-            SELECT
-                TO_CHAR(date_attended, 'Mon'),
-                COUNT(*)
-            FROM attendance
-            WHERE date_attended >= ADD_MONTHS(TRUNC(SYSDATE), -5)
-            GROUP BY
-                TO_CHAR(date_attended, 'Mon'),
-                TO_CHAR(date_attended, 'MM')
-            ORDER BY
-                TO_CHAR(date_attended, 'MM')
-        """)
-
-        monthly_data = cur.fetchall()
-
-        chart_labels = [row[0] for row in monthly_data]
-        chart_values = [row[1] for row in monthly_data]
+        if "profile" in g:
+            g.repo.trace = g.profile.sql
 
-        return render_template(
+    return g.repo
 
-            "index.html",
 
-            total_students=total_students,
+@app.teardown_appcontext
+def release_db(exc):
 
-            total_attendance=total_attendance,
+    g.pop("repo", None)
+    conn = g.pop("db", None)
 
-            today_attendance=today_attendance,
+    if conn is None:
+        return
 
-            attendance_percentage=attendance_percentage,
+    try:
 
-            recent=recent,
+        if exc is not None:
+            conn.rollback()
 
-            chart_labels=chart_labels,
+    finally:
 
-            chart_values=chart_values
+        db_backend.release(conn)
 
-        )
+        with _pool_stats_lock:
+            _pool_stats["released"] += 1
 
-    except Exception as e:
 
-        flash(
+# -----------------------------
+# Pool Metrics
+# -----------------------------
+@app.route("/metrics/pool")
+def pool_metrics():
 
-            f"Dashboard Error: {str(e)}",
+    if "admin" not in session:
+        return jsonify({
+            "success": False,
+            "message": "Unauthorized"
+        }), 401
 
-            "danger"
+    with _pool_stats_lock:
+        stats = dict(_pool_stats)
 
-        )
+    acquired = stats["acquired"]
 
-        return render_template(
+    return jsonify({
 
-            "index.html",
+        **db_backend.pool_info(),
 
-            total_students=0,
+        "acquired": acquired,
+        "released": stats["released"],
+        "waiting": stats["waiting"],
+        "timeouts": stats["timeouts"],
+        "wait_ms_avg": round(stats["wait_ms_total"] / acquired, 3) if acquired else 0,
+        "wait_ms_max": round(stats["wait_ms_max"], 3)
 
-            total_attendance=0,
+    })
 
-            today_attendance=0,
 
-            attendance_percentage=0,
+# -----------------------------
+# Cache Metrics
+# -----------------------------
+@app.route("/metrics/cache")
+def cache_metrics():
 
-            recent=[],
+    if "admin" not in session:
+        return jsonify({
+            "success": False,
+            "message": "Unauthorized"
+        }), 401
 
-            chart_labels=[],
+    return jsonify(cache_stats())
 
-            chart_values=[]
 
-        )
+# -----------------------------
+# Query Metrics
+# (per statement name, from repository.QueryStats)
+# -----------------------------
+@app.route("/metrics/queries")
+def query_metrics():
 
-    finally:
+    if "admin" not in session:
+        return jsonify({
+            "success": False,
+            "message": "Unauthorized"
+        }), 401
 
-        if cur:
-            cur.close()
+    return jsonify({
+        "backend": db_backend.name,
+        "queries": query_stats.snapshot()
+    })
 
-        if conn:
-            conn.close()
-#------------------------------
-# Login
-#------------------------------
-@app.route("/login", methods=["GET", "POST"])
-def login():
 
-    if "admin" in session:
-        return redirect("/")
+# -----------------------------
+# Request Metrics
+# -----------------------------
+# Latency histograms per route, connection acquire and render step
+# (QR, PDF, XLSX), reusing QueryStats. For routes the rows column
+# counts DB round trips made while serving the request.
+route_stats = QueryStats()
+acquire_stats = QueryStats()
+render_stats = QueryStats()
 
-    if request.method == "POST":
+# (route, status code) -> requests
+_request_counts = {}
+_request_counts_lock = threading.Lock()
 
-        username = request.form["username"].strip()
-        password = request.form["password"]
+# Scrapers can't log in; with METRICS_TOKEN set, /metrics also
+# accepts "Authorization: Bearer <token>"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
 
-        conn = None
-        cur = None
 
-        try:
-            conn = get_db()
-            cur = conn.cursor()
+def timed_render(kind):
 
-            cur.execute(
-                "SELECT password FROM admins WHERE username = :1",
-                (username,)
-            )
+    # Builders fed by repo.attendance_export() pull rows while they
+    # render; time spent in the stream's execute/fetch calls is
+    # already under query_stats, so it is taken out here.
+    def decorator(fn):
 
-            row = cur.fetchone()
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
 
-            if row and check_password_hash(row[0], password):
-                session["admin"] = username
-                flash("Login successful!", "success")
-                return redirect("/")
+            start = time.perf_counter()
+            fetch_start = stream_fetch_ms()
 
-            flash("Invalid username or password!", "danger")
+            try:
+                return fn(*args, **kwargs)
 
-        except Exception as e:
-            flash(f"Error: {str(e)}", "danger")
+            finally:
 
-        finally:
-            if cur:
-                cur.close()
-            if conn:
-                conn.close()
+                elapsed = (time.perf_counter() - start) * 1000
+                fetched = stream_fetch_ms() - fetch_start
 
-    return render_template("login.html")
+                render_stats.record(kind, max(elapsed - fetched, 0.0))
 
-@app.route("/logout")
-def logout():
+        return wrapper
 
-    session.clear()
+    return decorator
 
-    flash("Logged out successfully!", "success")
 
-    return redirect("/login")
+@app.before_request
+def start_request_timer():
 
-# -----------------------------
-# Signup
-# -----------------------------
+    g.request_start = time.perf_counter()
 
 
-@app.route("/signup", methods=["GET", "POST"])
-def signup():
-    if "admin" not in session:
-        flash("Access denied!", "danger")
-        return redirect("/login")
+@app.after_request
+def note_response_status(response):
 
-    if request.method == "POST":
+    g.response_status = response.status_code
 
-        username = request.form["username"].strip()
-        password = request.form["password"]
-        confirm = request.form["confirm_password"]
+    return response
 
-        # Check empty fields
-        if not username or not password or not confirm:
-            flash("All fields are required!", "danger")
-            return redirect("/signup")
 
-        # Check password match
-        if password != confirm:
-            flash("Passwords do not match!", "danger")
-            return redirect("/signup")
+@app.teardown_request
+def record_request_metrics(exc):
 
-        conn = None
-        cur = None
+    # Runs before release_db, so g.repo still holds the round trips
+    start = g.pop("request_start", None)
 
-        try:
+    if start is None:
+        return
 
-            conn = get_db()
-            cur = conn.cursor()
+    route = request.endpoint or "unmatched"
+    status = 500 if exc is not None else g.pop("response_status", 500)
+    repo = g.get("repo")
 
-            # Check if username already exists
-            cur.execute(
-                """
-                SELECT COUNT(*)
-                FROM admins
-                WHERE username = :1
-                """,
-                (username,)
-            )
+    route_stats.record(
+        route,
+        (time.perf_counter() - start) * 1000,
+        repo.round_trips if repo is not None else 0
+    )
 
-            count = cur.fetchone()[0]
+    with _request_counts_lock:
+        _request_counts[(route, status)] = _request_counts.get((route, status), 0) + 1
 
-            if count > 0:
-                flash("Username already exists!", "warning")
-                return redirect("/signup")
 
-            # Hash password
-            hashed_password = generate_password_hash(password)
+def prometheus_label(value):
 
-            # Insert new admin
-            cur.execute(
-                """
-                INSERT INTO admins (username, password)
-                VALUES (:1, :2)
-                """,
-                (username, hashed_password)
-            )
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
 
-            conn.commit()
 
-            flash("Account created successfully! Please login.", "success")
+def prometheus_histogram(lines, metric, help_text, label, stats):
 
-            return redirect("/login")
+    lines.append(f"# HELP {metric} {help_text}")
+    lines.append(f"# TYPE {metric} histogram")
 
-        except Exception as e:
+    for name, hist in stats.histograms().items():
 
-            if conn:
-                conn.rollback()
+        labels = f'{label}="{prometheus_label(name)}"'
 
-            flash(f"Error: {str(e)}", "danger")
+        for bound, count in hist["buckets"]:
 
-            return redirect("/signup")
+            le = "+Inf" if bound is None else f"{bound / 1000:g}"
 
-        finally:
+            lines.append(f'{metric}_bucket{{{labels},le="{le}"}} {count}')
 
-            if cur:
-                cur.close()
+        lines.append(f"{metric}_sum{{{labels}}} {hist['ms_total'] / 1000:.6f}")
+        lines.append(f"{metric}_count{{{labels}}} {hist['count']}")
 
-            if conn:
-                conn.close()
 
-    return render_template("signup.html")
+def prometheus_counter(lines, metric, help_text, samples, kind="counter"):
 
-@app.route("/scan")
+    lines.append(f"# HELP {metric} {help_text}")
+    lines.append(f"# TYPE {metric} {kind}")
 
-def scan():
+    for labels, value in samples:
 
-    if "admin" not in session:
-        return redirect("/login")
+        text = ",".join(f'{key}="{prometheus_label(val)}"' for key, val in labels.items())
 
-    return render_template("scan.html")
+        lines.append(f"{metric}{{{text}}} {value}" if text else f"{metric} {value}")
 
-# -----------------------------
-# Add Student
-# -----------------------------
 
-@app.route("/add_student", methods=["GET", "POST"])
-def add_student():
-    if "admin" not in session:
-        return redirect("/login")
-    if request.method == "POST":
+@app.route("/metrics")
+def prometheus_metrics():
 
-        name = request.form["name"].strip()
-        usn = request.form["usn"].strip().upper()
+    authorized = "admin" in session or (
+        METRICS_TOKEN
+        and request.headers.get("Authorization") == f"Bearer {METRICS_TOKEN}"
+    )
 
-        if not name or not usn:
-            flash("Name and USN cannot be empty!", "danger")
-            return redirect("/add_student")
+    if not authorized:
+        return jsonify({
+            "success": False,
+            "message": "Unauthorized"
+        }), 401
 
-        conn = None
-        cur = None
+    lines = []
 
-        try:
+    prometheus_histogram(
+        lines,
+        "attendance_request_duration_seconds",
+        "Request latency by route.",
+        "route",
+        route_stats
+    )
 
-            conn = get_db()
-            cur = conn.cursor()
+    with _request_counts_lock:
+        counts = sorted(_request_counts.items())
 
-            # Check duplicate USN
-            cur.execute(
-                "SELECT COUNT(*) FROM students WHERE usn=:1",
-                (usn,)
-            )
+    prometheus_counter(
+        lines,
+        "attendance_requests_total",
+        "Requests by route and status code.",
+        [({"route": route, "status": status}, count) for (route, status), count in counts]
+    )
 
-            count = cur.fetchone()[0]
+    prometheus_counter(
+        lines,
+        "attendance_request_db_round_trips_total",
+        "Database statements sent while serving each route.",
+        [({"route": name}, hist["rows"]) for name, hist in route_stats.histograms().items()]
+    )
 
-            if count > 0:
-                flash("USN already exists!", "warning")
-                return redirect("/add_student")
+    prometheus_histogram(
+        lines,
+        "attendance_sql_duration_seconds",
+        "Statement execution time by statement name.",
+        "statement",
+        query_stats
+    )
 
-            # Insert student
-            cur.execute("""
-                INSERT INTO students
-                (student_id, name, usn, qr_code)
-                VALUES
-                (student_seq.NEXTVAL, :1, :2, NULL)
-            """, (name, usn))
+    prometheus_counter(
+        lines,
+        "attendance_sql_rows_total",
+        "Rows fetched or affected by statement name.",
+        [({"statement": name}, stat["rows"]) for name, stat in query_stats.snapshot().items()]
+    )
 
-            conn.commit()
+    prometheus_histogram(
+        lines,
+        "attendance_db_acquire_seconds",
+        "Time to check a connection out of the backend.",
+        "backend",
+        acquire_stats
+    )
 
-            # Create QR folder if not exists
-            
-            qr_folder = os.path.join(app.static_folder, "qrcodes")
-            os.makedirs(qr_folder, exist_ok=True)
+    with _pool_stats_lock:
+        pool = dict(_pool_stats)
 
-            file_path = os.path.join(qr_folder, f"{usn}.png")
+    prometheus_counter(
+        lines,
+        "attendance_db_acquire_timeouts_total",
+        "Connection requests that timed out waiting for the pool.",
+        [({}, pool["timeouts"])]
+    )
 
-            qr_data = f"STUDENT:{usn}"
+    prometheus_counter(
+        lines,
+        "attendance_db_waiting",
+        "Requests currently waiting for a connection.",
+        [({}, pool["waiting"])],
+        kind="gauge"
+    )
 
-            qr = qrcode.QRCode(
-                version=2,
-                error_correction=qrcode.constants.ERROR_CORRECT_H,
-                box_size=20,
-                border=4
-            )
+    prometheus_histogram(
+        lines,
+        "attendance_render_duration_seconds",
+        "QR, PDF and XLSX render time.",
+        "kind",
+        render_stats
+    )
 
-            qr.add_data(qr_data)
-            qr.make(fit=True)
+    return Response(
+        "\n".join(lines) + "\n",
+        mimetype="text/plain; version=0.0.4"
+    )
 
-            img = qr.make_image(
-                fill_color="black",
-                back_color="white"
-            )
 
-            img.save(file_path)
+# -----------------------------
+# Request Profiling
+# -----------------------------
+# An admin can profile one request with "X-Profile: 1" or
+# "?_profile=1"; PROFILE_SAMPLE_RATE (0-1) also profiles that share
+# of all requests. The view runs under cProfile for a top-N function
+# summary while a sampler thread walks its stack every
+# PROFILE_INTERVAL_MS for collapsed stacks (flamegraph.pl /
+# speedscope input). Both land in PROFILE_DIR with the route and the
+# request's SQL timings; the response carries X-Profile-Id.
+#
+# Only one request is profiled at a time, and with no flag and a
+# zero sample rate the hooks return straight away.
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_TOP_N = int(os.getenv("PROFILE_TOP_N", "25"))
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+PROFILE_DIR = os.getenv(
+    "PROFILE_DIR",
+    os.path.join(app.instance_path, "profiles")
+)
 
-            db_path = f"qrcodes/{usn}.png"
+PROFILE_ID_RE = re.compile(r"^[0-9]{8}-[0-9]{6}-[A-Za-z0-9_.]+-[0-9a-f]{8}$")
 
-            cur.execute(
-                """
-                UPDATE students
-                SET qr_code=:1
-                WHERE usn=:2
-                """,
-                (db_path, usn)
-            )
-            conn.commit()
+_profile_lock = threading.Lock()
 
-            flash("Student added successfully!", "success")
 
-            return redirect("/")
+class RequestProfile:
 
-        except Exception as e:
+    def __init__(self, route):
 
-            if conn:
-                conn.rollback()
+        self.id = f"{datetime.now():%Y%m%d-%H%M%S}-{route}-{uuid.uuid4().hex[:8]}"
+        self.route = route
+        self.sql = []
+        self.stacks = {}
+        self.samples = 0
 
-            flash(f"Error: {str(e)}", "danger")
-            return redirect("/add_student")
+        self._profiler = cProfile.Profile()
+        self._thread_id = threading.get_ident()
+        self._done = threading.Event()
+        self._sampler = threading.Thread(target=self._sample, daemon=True)
 
-        finally:
+    def start(self):
 
-            if cur:
-                cur.close()
+        self.started = time.perf_counter()
+        self._sampler.start()
+        self._profiler.enable()
 
-            if conn:
-                conn.close()
+    def stop(self):
 
-    return render_template("add_student.html")
+        self._profiler.disable()
+        self._done.set()
+        self._sampler.join()
 
-@app.route("/mark_attendance/<path:usn>")
-def mark_attendance(usn):
-    
+        self.elapsed_ms = (time.perf_counter() - self.started) * 1000
 
-    if "admin" not in session:
-        return redirect("/login")
+    def _sample(self):
 
-    usn = unquote(usn)
+        interval = PROFILE_INTERVAL_MS / 1000
 
-    if not usn.startswith("STUDENT:"):
-        flash("Invalid QR Code", "danger")
-        return redirect("/scan")
+        while not self._done.wait(interval):
 
-    usn = usn.replace("STUDENT:", "", 1)
-    conn = None
-    cur = None
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
 
-    try:
+            while frame is not None:
 
-        conn = get_db()
-        cur = conn.cursor()
+                code = frame.f_code
+                stack.append(f"{short_path(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
 
-        # Find student
-        cur.execute("""
-            SELECT student_id, name
-            FROM students
-            WHERE usn = :1
-        """, (usn,))
+            if stack:
+                key = ";".join(reversed(stack))
+                self.stacks[key] = self.stacks.get(key, 0) + 1
+                self.samples += 1
 
-        student = cur.fetchone()
+    def top_functions(self):
 
-        if student is None:
-            flash("Student not found!", "danger")
-            return redirect("/scan")
+        stats = pstats.Stats(self._profiler).stats
 
-        student_id = student[0]
-        student_name = student[1]
+        rows = [
+            {
+                "function": f"{short_path(filename)}:{line}({func})",
+                "calls": ncalls,
+                "self_ms": round(tottime * 1000, 3),
+                "cumulative_ms": round(cumtime * 1000, 3)
+            }
+            for (filename, line, func), (_, ncalls, tottime, cumtime, _) in stats.items()
+        ]
 
-        # Prevent duplicate attendance
-        cur.execute("""
-            SELECT COUNT(*)
-            FROM attendance
-            WHERE student_id = :1
-            AND TRUNC(date_attended) = TRUNC(SYSDATE)
-        """, (student_id,))
+        return {
+            "by_cumulative": sorted(rows, key=lambda r: r["cumulative_ms"], reverse=True)[:PROFILE_TOP_N],
+            "by_self": sorted(rows, key=lambda r: r["self_ms"], reverse=True)[:PROFILE_TOP_N]
+        }
 
-        already = cur.fetchone()[0]
+    def save(self, status):
 
-        if already > 0:
-            flash(
-                f"{student_name} has already marked attendance today.",
-                "warning"
-            )
-            return redirect("/")
+        os.makedirs(PROFILE_DIR, exist_ok=True)
 
-        # Mark attendance
-        cur.execute("""
-            INSERT INTO attendance
-            (student_id, date_attended, status)
-            VALUES
-            (:1, SYSDATE, 'Present')
-        """, (student_id,))
+        with open(os.path.join(PROFILE_DIR, f"{self.id}.collapsed"), "w") as f:
 
-        conn.commit()
+            for stack, count in sorted(self.stacks.items()):
+                f.write(f"{stack} {count}\n")
 
-        flash(
-            f"Attendance marked successfully for {student_name}.",
-            "success"
-        )
+        summary = {
+            "id": self.id,
+            "route": self.route,
+            "method": request.method,
+            "path": request.path,
+            "status": status,
+            "elapsed_ms": round(self.elapsed_ms, 3),
+            "samples": self.samples,
+            "interval_ms": PROFILE_INTERVAL_MS,
+            "sql": [
+                {"statement": name, "ms": ms, "rows": rows}
+                for name, ms, rows in self.sql
+            ],
+            "sql_ms": round(sum(ms for _, ms, _ in self.sql), 3),
+            **self.top_functions()
+        }
 
-    except Exception as e:
+        with open(os.path.join(PROFILE_DIR, f"{self.id}.json"), "w") as f:
+            json.dump(summary, f, indent=2)
 
-        if conn:
-            conn.rollback()
+        prune_profiles()
 
-        flash(str(e), "danger")
 
-    finally:
+def short_path(filename):
 
-        if cur:
-            cur.close()
+    # "flask/app.py" rather than "app.py" so library frames stand out
+    parent, name = os.path.split(filename)
 
-        if conn:
-            conn.close()
+    return f"{os.path.basename(parent)}/{name}" if parent else name
 
-    return redirect("/")
 
-@app.route("/api/mark_attendance/<path:usn>")
-def api_mark_attendance(usn):
+def profile_summaries():
 
-    if "admin" not in session:
-        return jsonify({
-            "success": False,
-            "message": "Unauthorized"
-        })
+    # Oldest first
+    names = [name for name in os.listdir(PROFILE_DIR) if name.endswith(".json")]
 
-    usn = unquote(usn)
+    return sorted(names, key=lambda name: os.path.getmtime(os.path.join(PROFILE_DIR, name)))
 
-    if not usn.startswith("STUDENT:"):
-        return jsonify({
-            "success": False,
-            "message": "Invalid QR Code"
-        })
 
-    usn = usn.replace("STUDENT:", "", 1)
+def prune_profiles():
+
+    summaries = profile_summaries()
+
+    if PROFILE_KEEP <= 0 or len(summaries) <= PROFILE_KEEP:
+        return
+
+    for name in summaries[:-PROFILE_KEEP]:
+
+        profile_id = name[:-len(".json")]
+
+        for ext in (".json", ".collapsed"):
+
+            try:
+                os.remove(os.path.join(PROFILE_DIR, profile_id + ext))
+            except OSError:
+                pass
+
 
-    conn = None
-    cur = None
+def profile_requested():
+
+    if request.headers.get("X-Profile") == "1" or request.args.get("_profile") == "1":
+        return "admin" in session
+
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+@app.before_request
+def start_request_profile():
+
+    if not profile_requested():
+        return
+
+    # cProfile allows one active profiler; busy means skip this one
+    if not _profile_lock.acquire(blocking=False):
+        return
 
     try:
 
-        conn = get_db()
-        cur = conn.cursor()
+        g.profile = RequestProfile(request.endpoint or "unmatched")
+        g.profile.start()
 
-        # Find student
-        cur.execute("""
-            SELECT student_id, name
-            FROM students
-            WHERE usn = :1
-        """, (usn,))
+    except Exception:
 
-        student = cur.fetchone()
+        g.pop("profile", None)
+        _profile_lock.release()
+        raise
 
-        if student is None:
 
-            return jsonify({
-                "success": False,
-                "message": "Student not found"
-            })
+@app.after_request
+def finish_request_profile(response):
 
-        student_id = student[0]
-        student_name = student[1]
+    profile = g.pop("profile", None)
 
-        # Check duplicate attendance
-        cur.execute("""
-            SELECT COUNT(*)
-            FROM attendance
-            WHERE student_id = :1
-            AND TRUNC(date_attended)=TRUNC(SYSDATE)
-        """, (student_id,))
+    if profile is None:
+        return response
 
-        already = cur.fetchone()[0]
+    try:
 
-        if already > 0:
+        profile.stop()
+        profile.save(response.status_code)
 
-            return jsonify({
-                "success": False,
-                "message": f"{student_name} already marked today"
-            })
+        response.headers["X-Profile-Id"] = profile.id
+
+    except Exception as e:
+
+        app.logger.warning("Could not save request profile: %s", e)
+
+    finally:
+
+        _profile_lock.release()
+
+    return response
+
+
+@app.teardown_request
+def abandon_request_profile(exc):
+
+    # after_request did not run (unhandled error); drop the profile
+    profile = g.pop("profile", None)
+
+    if profile is not None:
+
+        profile.stop()
+        _profile_lock.release()
+
+
+@app.route("/metrics/profiles")
+def list_profiles():
+
+    if "admin" not in session:
+        return jsonify({
+            "success": False,
+            "message": "Unauthorized"
+        }), 401
+
+    profiles = []
+
+    if os.path.isdir(PROFILE_DIR):
+
+        for name in reversed(profile_summaries()):
+
+            try:
+
+                with open(os.path.join(PROFILE_DIR, name)) as f:
+                    summary = json.load(f)
+
+            except (OSError, ValueError):
+                continue
+
+            profiles.append({
+                "id": summary["id"],
+                "route": summary["route"],
+                "path": summary["path"],
+                "status": summary["status"],
+                "elapsed_ms": summary["elapsed_ms"],
+                "sql_ms": summary["sql_ms"],
+                "summary_url": url_for("download_profile", profile_id=summary["id"], fmt="json"),
+                "collapsed_url": url_for("download_profile", profile_id=summary["id"], fmt="collapsed")
+            })
+
+    return jsonify({
+        "success": True,
+        "profiles": profiles
+    })
+
+
+@app.route("/metrics/profiles/<profile_id>.<any(json, collapsed):fmt>")
+def download_profile(profile_id, fmt):
+
+    if "admin" not in session:
+        return jsonify({
+            "success": False,
+            "message": "Unauthorized"
+        }), 401
+
+    if not PROFILE_ID_RE.match(profile_id):
+        abort(404)
+
+    path = os.path.join(PROFILE_DIR, f"{profile_id}.{fmt}")
+
+    if not os.path.exists(path):
+        abort(404)
+
+    return send_file(
+        path,
+        mimetype="application/json" if fmt == "json" else "text/plain",
+        as_attachment=fmt == "collapsed",
+        download_name=f"{profile_id}.{fmt}"
+    )
+
+
+# -----------------------------
+# Schema Maintenance
+# -----------------------------
+@app.cli.command("migrate")
+def migrate_command():
+    """Apply pending migrations/*.sql files in order."""
+
+    applied = db_backend.migrate()
+
+    if not applied:
+        print("Schema is up to date.")
+
+    for filename in applied:
+        print(f"Applied {filename}")
+
+
+@app.cli.command("rebuild-rollups")
+def rebuild_rollups_command():
+    """Recompute the attendance rollup tables from attendance."""
+
+    with db_backend.session() as repo:
+        repo.rebuild_rollups()
+
+    invalidate_dashboard()
+
+    print("Attendance rollups rebuilt.")
+
+
+@app.cli.command("explain-plans")
+def explain_plans_command():
+    """Print the query plans for the indexed queries."""
+
+    full_scans = 0
+
+    with db_backend.session() as repo:
+
+        for name, table in repo.PLAN_CHECKS:
+
+            plan, full = repo.explain_plan(name, table)
+
+            print(f"== {name}: {'FULL SCAN' if full else 'index access'}")
+
+            for line in plan:
+                print(line)
+
+            print()
+
+            if full:
+                full_scans += 1
+
+    if full_scans:
+        raise SystemExit(f"{full_scans} statement(s) scan a table in full")
+
+
+# -----------------------------
+# Dashboard Data
+# -----------------------------
+# Everything the dashboard shows comes back from one UNION ALL
+# round trip, tagged by the first column, and is cached for
+# DASHBOARD_CACHE_TTL seconds. Marking attendance and roster
+# changes invalidate the cache; concurrent misses share one
+# reload instead of each running the query.
+DASHBOARD_CACHE_TTL = int(os.getenv("DASHBOARD_CACHE_TTL", "30"))
+
+_dashboard = {
+    "data": None,
+    "expires": 0
+}
+_dashboard_lock = threading.Lock()
+_dashboard_reload_lock = threading.Lock()
+
+_dashboard_stats = {
+    "hits": 0,
+    "misses": 0,
+    "invalidations": 0
+}
+
+
+def load_dashboard_data(repo):
+
+    data = {
+        "total_students": 0,
+        "total_attendance": 0,
+        "today_attendance": 0
+    }
+    recent = []
+    months = []
+
+    for kind, name, usn, when, status, n1, n2, n3 in repo.dashboard_rows():
+
+        if kind == "totals":
+            data["total_students"] = n1
+            data["total_attendance"] = n2
+            data["today_attendance"] = n3
+
+        elif kind == "recent":
+            recent.append((name, usn, when, status))
+
+        else:
+            months.append((when, when.strftime("%b"), n1))
+
+    recent.sort(key=lambda row: row[2], reverse=True)
+    months.sort()
+
+    data["recent"] = recent
+    data["chart_labels"] = [label for _, label, _ in months]
+    data["chart_values"] = [total for _, _, total in months]
+
+    return data
+
+
+def get_dashboard_data():
+
+    with _dashboard_lock:
+
+        if _dashboard["data"] is not None and time.monotonic() < _dashboard["expires"]:
+            _dashboard_stats["hits"] += 1
+            return _dashboard["data"]
+
+    with _dashboard_reload_lock:
+
+        # Another request may have reloaded while we waited
+        with _dashboard_lock:
+
+            if _dashboard["data"] is not None and time.monotonic() < _dashboard["expires"]:
+                _dashboard_stats["hits"] += 1
+                return _dashboard["data"]
+
+            _dashboard_stats["misses"] += 1
+
+        data = load_dashboard_data(get_repo())
+
+        with _dashboard_lock:
+            _dashboard["data"] = data
+            _dashboard["expires"] = time.monotonic() + DASHBOARD_CACHE_TTL
+
+    return data
+
+
+def invalidate_dashboard():
+
+    with _dashboard_lock:
+
+        _dashboard["data"] = None
+        _dashboard_stats["invalidations"] += 1
+
+
+def live_dashboard_counts(data):
+
+    # Today's count is live from the bitmap even when the rest of the
+    # dashboard is served from cache
+    today_attendance = today_attendance_count()
+
+    if today_attendance is not None:
+        data["today_attendance"] = today_attendance
+
+    if data["total_students"] > 0:
+
+        data["attendance_percentage"] = round(
+            (data["today_attendance"] / data["total_students"]) * 100,
+            2
+        )
+
+    else:
+
+        data["attendance_percentage"] = 0
+
+    return data
+
+
+# -----------------------------
+# Dashboard Stream
+# (Server-Sent Events)
+# -----------------------------
+# Open dashboards subscribe to /stream/dashboard. Each mark is turned
+# into one delta (counts plus the new recent rows), serialized once
+# and queued to every subscriber, so N viewers cost one update
+# rather than N dashboard queries. Totals are seeded from the
+# dashboard cache when the first viewer connects and then advanced
+# by the marks this process commits; marks taken by another worker
+# process show up on the next page load.
+#
+# Each open stream holds a server thread, so DASHBOARD_STREAM_MAX
+# caps them. A subscriber whose queue fills up is dropped and its
+# browser reconnects with a fresh snapshot.
+DASHBOARD_STREAM_MAX = int(os.getenv("DASHBOARD_STREAM_MAX", "50"))
+DASHBOARD_STREAM_QUEUE = 100
+DASHBOARD_STREAM_KEEPALIVE = 15
+DASHBOARD_STREAM_RETRY_MS = 3000
+
+# Matches the recent-rows limit in the dashboard statement
+DASHBOARD_RECENT_ROWS = 5
+
+
+def sse_message(event, payload):
+
+    return f"event: {event}\ndata: {json.dumps(payload, default=str)}\n\n"
+
+
+class DashboardPublisher:
+
+    def __init__(self):
+
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._total_attendance = None
+
+        self.stats = {
+            "published": 0,
+            "delivered": 0,
+            "dropped": 0
+        }
+
+    def subscribe(self, total_attendance):
+
+        with self._lock:
+
+            if len(self._subscribers) >= DASHBOARD_STREAM_MAX:
+                return None
+
+            if not self._subscribers:
+                self._total_attendance = total_attendance
+
+            subscriber = queue.Queue(maxsize=DASHBOARD_STREAM_QUEUE)
+            self._subscribers.add(subscriber)
+
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+
+        with self._lock:
+
+            self._subscribers.discard(subscriber)
+
+            if not self._subscribers:
+                self._total_attendance = None
+
+    def snapshot(self):
+
+        with self._lock:
+            return {**self.stats, "subscribers": len(self._subscribers)}
+
+    def publish_marks(self, rows):
+
+        # rows are (name, usn, marked_at, status) for committed marks
+        if not rows or not self._subscribers:
+            return
+
+        with self._lock:
+
+            if not self._subscribers:
+                return
+
+            self._total_attendance += len(rows)
+            total_attendance = self._total_attendance
+
+        # Backdated batch scans count towards the total but are not
+        # today's news: they stay out of the recent rows and chart
+        today = date.today()
+
+        payload = {
+            "total_students": len(_student_index),
+            "total_attendance": total_attendance,
+            "recent": [
+                {
+                    "name": name,
+                    "usn": usn,
+                    "date": str(when),
+                    "status": status,
+                    "month": when.strftime("%b")
+                }
+                for name, usn, when, status in sorted(rows, key=lambda row: row[2], reverse=True)
+                if when.date() == today
+            ]
+        }
+
+        # With the bitmap cold the count is unknown; leave it out
+        # rather than push a zero over the dashboards' current value
+        today_attendance = today_attendance_count()
+
+        if today_attendance is not None:
+
+            payload["today_attendance"] = today_attendance
+            payload["attendance_percentage"] = round(
+                today_attendance / payload["total_students"] * 100,
+                2
+            ) if payload["total_students"] else 0
+
+        message = sse_message("mark", payload)
+
+        with self._lock:
+
+            self.stats["published"] += 1
+
+            for subscriber in list(self._subscribers):
+
+                try:
+
+                    subscriber.put_nowait(message)
+                    self.stats["delivered"] += 1
+
+                except queue.Full:
+
+                    # Too far behind; end its stream so it reconnects
+                    self._subscribers.discard(subscriber)
+                    self.stats["dropped"] += 1
+
+                    while True:
+
+                        try:
+                            subscriber.get_nowait()
+                        except queue.Empty:
+                            break
+
+                    subscriber.put_nowait(None)
+
+            if not self._subscribers:
+                self._total_attendance = None
+
+
+dashboard_publisher = DashboardPublisher()
+
+
+@app.route("/stream/dashboard")
+def stream_dashboard():
+
+    if "admin" not in session:
+        return jsonify({
+            "success": False,
+            "message": "Unauthorized"
+        }), 401
+
+    # The snapshot is read here, inside the request, so the DB
+    # connection goes back to the pool before the stream starts
+    snapshot = live_dashboard_counts(dict(get_dashboard_data()))
+
+    subscriber = dashboard_publisher.subscribe(snapshot["total_attendance"])
+
+    if subscriber is None:
+        return jsonify({
+            "success": False,
+            "message": "Too many dashboard streams"
+        }), 503
+
+    def events():
+
+        try:
+
+            yield f"retry: {DASHBOARD_STREAM_RETRY_MS}\n\n"
+
+            yield sse_message("snapshot", {
+                "total_students": snapshot["total_students"],
+                "total_attendance": snapshot["total_attendance"],
+                "today_attendance": snapshot["today_attendance"],
+                "attendance_percentage": snapshot["attendance_percentage"],
+                "recent": [
+                    {"name": name, "usn": usn, "date": str(when), "status": status}
+                    for name, usn, when, status in snapshot["recent"]
+                ],
+                "chart_labels": snapshot["chart_labels"],
+                "chart_values": snapshot["chart_values"]
+            })
+
+            while True:
+
+                try:
+                    message = subscriber.get(timeout=DASHBOARD_STREAM_KEEPALIVE)
+                except queue.Empty:
+                    message = ": keepalive\n\n"
+
+                if message is None:
+                    break
+
+                yield message
+
+        finally:
+
+            dashboard_publisher.unsubscribe(subscriber)
+
+    response = Response(events(), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+
+    return response
+
+
+# -----------------------------
+# Home Page / Dashboard
+# -----------------------------
+@app.route("/")
+def index():
+
+    # Check login
+    if "admin" not in session:
+        return redirect("/login")
+
+    try:
+
+        data = live_dashboard_counts(dict(get_dashboard_data()))
+
+        return render_template(
+
+            "index.html",
+
+            recent_rows=DASHBOARD_RECENT_ROWS,
+
+            **data
+
+        )
+
+    except Exception as e:
+
+        flash(
+
+            f"Dashboard Error: {str(e)}",
+
+            "danger"
+
+        )
+
+        return render_template(
+
+            "index.html",
+
+            total_students=0,
+
+            total_attendance=0,
+
+            today_attendance=0,
+
+            attendance_percentage=0,
+
+            recent=[],
+
+            chart_labels=[],
+
+            chart_values=[],
+
+            recent_rows=DASHBOARD_RECENT_ROWS
+
+        )
+
+#------------------------------
+# Login
+#------------------------------
+@app.route("/login", methods=["GET", "POST"])
+def login():
+
+    if "admin" in session:
+        return redirect("/")
+
+    if request.method == "POST":
+
+        username = request.form["username"].strip()
+        password = request.form["password"]
+
+        try:
+
+            password_hash = get_repo().admin_password(username)
+
+            if password_hash and check_password_hash(password_hash, password):
+                session["admin"] = username
+                flash("Login successful!", "success")
+                return redirect("/")
+
+            flash("Invalid username or password!", "danger")
+
+        except Exception as e:
+            flash(f"Error: {str(e)}", "danger")
+
+    return render_template("login.html")
+
+@app.route("/logout")
+def logout():
+
+    session.clear()
+
+    flash("Logged out successfully!", "success")
+
+    return redirect("/login")
+
+# -----------------------------
+# Signup
+# -----------------------------
+
+
+@app.route("/signup", methods=["GET", "POST"])
+def signup():
+    if "admin" not in session:
+        flash("Access denied!", "danger")
+        return redirect("/login")
+
+    if request.method == "POST":
+
+        username = request.form["username"].strip()
+        password = request.form["password"]
+        confirm = request.form["confirm_password"]
+
+        # Check empty fields
+        if not username or not password or not confirm:
+            flash("All fields are required!", "danger")
+            return redirect("/signup")
+
+        # Check password match
+        if password != confirm:
+            flash("Passwords do not match!", "danger")
+            return redirect("/signup")
+
+        repo = None
+
+        try:
+
+            repo = get_repo()
+
+            # Check if username already exists
+            if repo.admin_exists(username):
+                flash("Username already exists!", "warning")
+                return redirect("/signup")
+
+            # Hash password
+            hashed_password = generate_password_hash(password)
+
+            # Insert new admin
+            repo.create_admin(username, hashed_password)
+
+            repo.commit()
+
+            flash("Account created successfully! Please login.", "success")
+
+            return redirect("/login")
+
+        except Exception as e:
+
+            if repo:
+                repo.rollback()
+
+            flash(f"Error: {str(e)}", "danger")
+
+            return redirect("/signup")
+
+
+    return render_template("signup.html")
+
+@app.route("/scan")
+
+def scan():
+
+    if "admin" not in session:
+        return redirect("/login")
+
+    return render_template("scan.html")
+
+# -----------------------------
+# QR Code Images
+# -----------------------------
+# QR codes depend only on the USN, so they are rendered on demand
+# by /qr/<usn>.png|svg and kept in a bounded in-memory LRU. Writing
+# PNGs into static/qrcodes is optional (QR_STATIC_FILES) and uses
+# the same renderer, so both paths produce identical images.
+QR_STATIC_FILES = os.getenv("QR_STATIC_FILES", "1") == "1"
+QR_CACHE_MAX_BYTES = int(os.getenv("QR_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+
+QR_BOX_SIZE = 20
+QR_MIN_BOX_SIZE = 1
+QR_MAX_BOX_SIZE = 40
+
+QR_MIMETYPES = {
+    "png": "image/png",
+    "svg": "image/svg+xml"
+}
+
+QR_WORKERS = int(os.getenv("QR_WORKERS", str(os.cpu_count() or 2)))
+
+_qr_process_pool = None
+_qr_process_pool_lock = threading.Lock()
+
+_qr_cache = OrderedDict()
+_qr_cache_bytes = 0
+_qr_cache_lock = threading.Lock()
+
+_qr_cache_stats = {
+    "hits": 0,
+    "misses": 0,
+    "evictions": 0
+}
+
+
+def qr_folder():
+
+    folder = os.path.join(app.static_folder, "qrcodes")
+    os.makedirs(folder, exist_ok=True)
+
+    return folder
+
+
+def qr_db_path(usn):
+
+    return f"qrcodes/{usn}.png"
+
+
+@timed_render("qr")
+def render_qr(usn, fmt="png", box_size=QR_BOX_SIZE):
+
+    qr = qrcode.QRCode(
+        version=2,
+        error_correction=qrcode.constants.ERROR_CORRECT_H,
+        box_size=box_size,
+        border=4
+    )
+
+    qr.add_data(f"STUDENT:{usn}")
+    qr.make(fit=True)
+
+    if fmt == "svg":
+
+        img = qr.make_image(image_factory=SvgPathImage)
+
+    else:
+
+        img = qr.make_image(
+            fill_color="black",
+            back_color="white"
+        )
+
+    output = BytesIO()
+    img.save(output)
+
+    return output.getvalue()
+
+
+def get_qr_process_pool():
+
+    # Shared by bulk imports and ID-card sheets. spawn rather than
+    # fork: the pool is started beside request threads.
+    global _qr_process_pool
+
+    with _qr_process_pool_lock:
+
+        if _qr_process_pool is None:
+
+            _qr_process_pool = ProcessPoolExecutor(
+                max_workers=QR_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+
+    return _qr_process_pool
+
+
+def qr_matrix(usn):
+
+    qr = qrcode.QRCode(
+        version=2,
+        error_correction=qrcode.constants.ERROR_CORRECT_H,
+        border=0
+    )
+
+    qr.add_data(f"STUDENT:{usn}")
+    qr.make(fit=True)
+
+    return qr.get_matrix()
+
+
+def qr_matrix_chunk(usns):
+
+    return [qr_matrix(usn) for usn in usns]
+
+
+def write_qr_png(usn, folder):
+
+    with open(os.path.join(folder, f"{usn}.png"), "wb") as f:
+        f.write(render_qr(usn))
+
+    return usn
+
+
+def cached_qr(usn, fmt, box_size):
+
+    # Returns (bytes, etag)
+    global _qr_cache_bytes
+
+    key = (usn, fmt, box_size)
+
+    with _qr_cache_lock:
+
+        entry = _qr_cache.get(key)
+
+        if entry is not None:
+            _qr_cache.move_to_end(key)
+            _qr_cache_stats["hits"] += 1
+            return entry
+
+        _qr_cache_stats["misses"] += 1
+
+    data = render_qr(usn, fmt, box_size)
+    entry = (data, hashlib.sha256(data).hexdigest()[:32])
+
+    with _qr_cache_lock:
+
+        if key not in _qr_cache:
+            _qr_cache[key] = entry
+            _qr_cache_bytes += len(data)
+
+        while _qr_cache_bytes > QR_CACHE_MAX_BYTES and len(_qr_cache) > 1:
+
+            _, (old, _) = _qr_cache.popitem(last=False)
+            _qr_cache_bytes -= len(old)
+            _qr_cache_stats["evictions"] += 1
+
+    return entry
+
+
+@app.route("/qr/<usn>.<any(png, svg):fmt>")
+def qr_image(usn, fmt):
+
+    if "admin" not in session:
+        return redirect("/login")
+
+    usn = usn.strip().upper()
+
+    if lookup_student(usn, get_repo()) is None:
+        abort(404)
+
+    box_size = request.args.get("size", QR_BOX_SIZE, type=int)
+    box_size = max(QR_MIN_BOX_SIZE, min(box_size, QR_MAX_BOX_SIZE))
+
+    data, etag = cached_qr(usn, fmt, box_size)
+
+    response = app.response_class(data, mimetype=QR_MIMETYPES[fmt])
+
+    # The image for a given USN/format/size never changes
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.max_age = 31536000
+    response.cache_control.immutable = True
+
+    return response.make_conditional(request)
+
+
+# -----------------------------
+# Add Student
+# -----------------------------
+
+@app.route("/add_student", methods=["GET", "POST"])
+def add_student():
+    if "admin" not in session:
+        return redirect("/login")
+    if request.method == "POST":
+
+        name = request.form["name"].strip()
+        usn = request.form["usn"].strip().upper()
+
+        if not name or not usn:
+            flash("Name and USN cannot be empty!", "danger")
+            return redirect("/add_student")
+
+        repo = None
+
+        try:
+
+            repo = get_repo()
+
+            # Check duplicate USN
+            if repo.usn_taken(usn):
+                flash("USN already exists!", "warning")
+                return redirect("/add_student")
+
+            # Insert student
+            student_id = repo.insert_student(
+                name,
+                usn,
+                qr_db_path(usn) if QR_STATIC_FILES else None
+            )
+
+            repo.commit()
+
+            student_index_put(usn, student_id, name)
+            invalidate_dashboard()
+
+            if QR_STATIC_FILES:
+                write_qr_png(usn, qr_folder())
+
+            flash("Student added successfully!", "success")
+
+            return redirect("/")
+
+        except Exception as e:
+
+            if repo:
+                repo.rollback()
+
+            flash(f"Error: {str(e)}", "danger")
+            return redirect("/add_student")
+
+    return render_template("add_student.html")
+
+# -----------------------------
+# Bulk Student Import
+# -----------------------------
+# A roster file (CSV or XLSX with "name" and "usn" columns) is
+# inserted with one executemany() in a single transaction; QR
+# images are then rendered in a process pool. Progress is kept in
+# _import_jobs and polled by the import page.
+QR_CHUNK_SIZE = 25
+
+IMPORT_MAX_ROWS = int(os.getenv("IMPORT_MAX_ROWS", "5000"))
+
+# Finished jobs are dropped after this many seconds
+IMPORT_RESULT_TTL = int(os.getenv("IMPORT_RESULT_TTL", "3600"))
+
+_import_executor = ThreadPoolExecutor(
+    max_workers=1,
+    thread_name_prefix="import"
+)
+
+_import_jobs = {}
+_import_jobs_lock = threading.Lock()
+
+
+def read_roster(filename, stream):
+
+    # Returns [(line, name, usn)] from a CSV or XLSX upload
+    if filename.lower().endswith(".xlsx"):
+
+        wb = load_workbook(stream, read_only=True, data_only=True)
+        rows = wb.active.iter_rows(values_only=True)
+
+    else:
+
+        text = io.TextIOWrapper(stream, encoding="utf-8-sig")
+        rows = csv.reader(text)
+
+    header = [str(cell or "").strip().lower() for cell in next(rows, [])]
+
+    if "name" not in header or "usn" not in header:
+        raise ValueError("The first row must contain 'name' and 'usn' columns")
+
+    name_col = header.index("name")
+    usn_col = header.index("usn")
+
+    roster = []
+
+    for line, row in enumerate(rows, start=2):
+
+        row = list(row)
+
+        if len(row) <= max(name_col, usn_col):
+            row += [None] * (max(name_col, usn_col) + 1 - len(row))
+
+        name = str(row[name_col] or "").strip()
+        usn = str(row[usn_col] or "").strip().upper()
+
+        if not name and not usn:
+            continue
+
+        roster.append((line, name, usn))
+
+        if len(roster) > IMPORT_MAX_ROWS:
+            raise ValueError(f"At most {IMPORT_MAX_ROWS} students per import")
+
+    return roster
+
+
+def import_job_view(job):
+
+    with _import_jobs_lock:
+
+        return {
+            "id": job["id"],
+            "filename": job["filename"],
+            "status": job["status"],
+            "total": job["total"],
+            "inserted": job["inserted"],
+            "qr_done": job["qr_done"],
+            "qr_total": job["qr_total"],
+            "rejected": list(job["rejected"]),
+            "error": job["error"]
+        }
+
+
+def cleanup_import_jobs():
+
+    now = datetime.now()
+
+    with _import_jobs_lock:
+
+        expired = [
+            job_id for job_id, job in _import_jobs.items()
+            if job["finished"]
+            and (now - job["finished"]).total_seconds() > IMPORT_RESULT_TTL
+        ]
+
+        for job_id in expired:
+            del _import_jobs[job_id]
+
+
+def run_import_job(job_id, roster):
+
+    with _import_jobs_lock:
+        job = _import_jobs[job_id]
+        job["status"] = "inserting"
+
+    # Built here and published under the lock, since
+    # import_job_view copies the list while this runs
+    rejected = []
+
+    try:
+
+        accepted = []
+        seen = set()
+
+        for line, name, usn in roster:
+
+            reason = None
+
+            if not name or not usn:
+                reason = "Name and USN cannot be empty"
+            elif usn in seen:
+                reason = "Duplicate USN in file"
+
+            if reason:
+                rejected.append({"line": line, "usn": usn, "reason": reason})
+                continue
+
+            seen.add(usn)
+            accepted.append((line, name, usn))
+
+        with db_backend.session() as repo:
+
+            # USN check against the roster already in the database
+            existing = repo.student_usns()
+
+            rows = []
+
+            for line, name, usn in accepted:
+
+                if usn in existing:
+                    rejected.append({"line": line, "usn": usn, "reason": "USN already exists"})
+                    continue
+
+                rows.append((name, usn, qr_db_path(usn) if QR_STATIC_FILES else None))
+
+            if rows:
+
+                repo.insert_students(rows)
+
+                repo.commit()
+
+        # With QR_STATIC_FILES off, images are rendered on request
+        # and there is no QR phase to report
+        usns = [usn for _, usn, _ in rows] if QR_STATIC_FILES else []
+
+        with _import_jobs_lock:
+            job["inserted"] = len(rows)
+            job["qr_total"] = len(usns)
+            job["rejected"] = rejected
+            job["status"] = "generating"
+
+        load_student_index()
+        invalidate_dashboard()
+
+        folder = qr_folder()
+
+        pool = get_qr_process_pool()
+
+        futures = [
+            pool.submit(write_qr_chunk, usns[i:i + QR_CHUNK_SIZE], folder)
+            for i in range(0, len(usns), QR_CHUNK_SIZE)
+        ]
+
+        for future in as_completed(futures):
+
+            timings = future.result()
+
+            for elapsed_ms in timings:
+                render_stats.record("qr", elapsed_ms)
+
+            with _import_jobs_lock:
+                job["qr_done"] += len(timings)
+
+        with _import_jobs_lock:
+            job["status"] = "done"
+            job["finished"] = datetime.now()
+
+    except Exception as e:
+
+        with _import_jobs_lock:
+            job["status"] = "failed"
+            job["error"] = str(e)
+            job["rejected"] = rejected
+            job["finished"] = datetime.now()
+
+
+def write_qr_chunk(usns, folder):
+
+    # Runs in the QR process pool, where render_stats is the child's
+    # own copy; the render times are returned for the parent to record
+    timings = []
+
+    for usn in usns:
+
+        start = time.perf_counter()
+
+        data = render_qr.__wrapped__(usn)
+
+        timings.append((time.perf_counter() - start) * 1000)
+
+        with open(os.path.join(folder, f"{usn}.png"), "wb") as f:
+            f.write(data)
+
+    return timings
+
+
+@app.route("/students/import", methods=["GET", "POST"])
+def import_students():
+
+    if "admin" not in session:
+        return redirect("/login")
+
+    if request.method == "GET":
+        return render_template("import_students.html")
+
+    upload = request.files.get("roster")
+
+    if not upload or not upload.filename:
+        return jsonify({
+            "success": False,
+            "message": "Choose a CSV or XLSX file"
+        }), 400
+
+    try:
+
+        roster = read_roster(upload.filename, upload.stream)
+
+    except Exception as e:
+
+        return jsonify({
+            "success": False,
+            "message": f"Could not read {upload.filename}: {str(e)}"
+        }), 400
+
+    job = {
+        "id": uuid.uuid4().hex,
+        "filename": upload.filename,
+        "status": "queued",
+        "total": len(roster),
+        "inserted": 0,
+        "qr_done": 0,
+        "qr_total": 0,
+        "rejected": [],
+        "error": None,
+        "finished": None
+    }
+
+    cleanup_import_jobs()
+
+    with _import_jobs_lock:
+        _import_jobs[job["id"]] = job
+
+    _import_executor.submit(run_import_job, job["id"], roster)
+
+    return jsonify({
+
+        "success": True,
+
+        "job": import_job_view(job),
+
+        "status_url": url_for("import_status", job_id=job["id"])
+
+    }), 202
+
+
+@app.route("/students/import/<job_id>")
+def import_status(job_id):
+
+    if "admin" not in session:
+        return jsonify({
+            "success": False,
+            "message": "Unauthorized"
+        }), 401
+
+    job = _import_jobs.get(job_id)
+
+    if job is None:
+        return jsonify({
+            "success": False,
+            "message": "Import not found"
+        }), 404
+
+    return jsonify({
+        "success": True,
+        "job": import_job_view(job)
+    })
+
+
+# -----------------------------
+# Student Index
+# (USN -> student_id, name)
+# -----------------------------
+# The roster only changes through add_student, edit_student and
+# delete_student, so scans resolve USNs from this process-local
+# copy instead of querying students. Each worker process keeps its
+# own copy: it is reloaded after STUDENT_INDEX_TTL seconds, and a
+# miss triggers a reload at most every STUDENT_INDEX_MISS_RELOAD
+# seconds so students added by another worker are picked up.
+STUDENT_INDEX_TTL = int(os.getenv("STUDENT_INDEX_TTL", "300"))
+STUDENT_INDEX_MISS_RELOAD = int(os.getenv("STUDENT_INDEX_MISS_RELOAD", "5"))
+
+_student_index = {}
+_student_index_loaded = None
+_student_index_version = 0
+_student_index_lock = threading.Lock()
+
+# Held for the whole reload so concurrent misses wait for one query
+# instead of each running their own; re-entrant so a caller that
+# already holds it can call load_student_index() directly.
+_student_index_reload_lock = threading.RLock()
+
+_student_index_stats = {
+    "hits": 0,
+    "misses": 0,
+    "reloads": 0
+}
+
+
+def student_index_age():
+
+    loaded = _student_index_loaded
+
+    if loaded is None:
+        return None
+
+    return time.monotonic() - loaded
+
+
+def load_student_index(repo=None):
+
+    # Request handlers pass their own repository: opening a second
+    # pooled session while g.db is held can starve the pool.
+    global _student_index, _student_index_loaded, _student_index_version
+
+    with _student_index_reload_lock:
+
+        if repo is None:
+
+            with db_backend.session() as repo:
+                rows = repo.student_index_rows()
+
+        else:
+            rows = repo.student_index_rows()
+
+        index = {
+            usn: (student_id, name)
+            for usn, student_id, name in rows
+        }
+
+        with _student_index_lock:
+
+            _student_index = index
+            _student_index_loaded = time.monotonic()
+            _student_index_version += 1
+            _student_index_stats["reloads"] += 1
+
+
+def reload_student_index(repo, max_age):
+
+    # Single-flight: whoever gets the lock reloads, the rest find a
+    # fresh index when they get it and skip the query.
+    with _student_index_reload_lock:
+
+        age = student_index_age()
+
+        if age is None or age > max_age:
+            load_student_index(repo)
+
+
+def lookup_student(usn, repo=None):
+
+    age = student_index_age()
+
+    if age is None or age > STUDENT_INDEX_TTL:
+        reload_student_index(repo, STUDENT_INDEX_TTL)
+        age = 0
+
+    student = _student_index.get(usn)
+
+    if student is None and age > STUDENT_INDEX_MISS_RELOAD:
+        reload_student_index(repo, STUDENT_INDEX_MISS_RELOAD)
+        student = _student_index.get(usn)
+
+    with _student_index_lock:
+
+        if student is None:
+            _student_index_stats["misses"] += 1
+        else:
+            _student_index_stats["hits"] += 1
+
+    return student
+
+
+def student_index_put(usn, student_id, name):
+
+    global _student_index_version
+
+    with _student_index_lock:
+
+        _student_index[usn] = (student_id, name)
+        _student_index_version += 1
+
+
+def student_index_remove(usn):
+
+    global _student_index_version
+
+    with _student_index_lock:
+
+        if _student_index.pop(usn, None) is not None:
+            _student_index_version += 1
+
+
+# -----------------------------
+# Student Search
+# -----------------------------
+# USNs are matched by prefix on the normalized, indexed usn_key
+# column (migration 004). Names are matched against an inverted
+# index built from the student index: whole tokens, token prefixes
+# and, for infix matches, character trigrams. The inverted index is
+# rebuilt lazily whenever the student index changes (reload, add,
+# edit, delete), so it never lags the roster this worker sees.
+SEARCH_PAGE_SIZE = int(os.getenv("SEARCH_PAGE_SIZE", "20"))
+SEARCH_MAX_PAGE_SIZE = 100
+SEARCH_USN_LIMIT = 200
+SEARCH_TRIGRAM_MIN = 0.6
+
+SCORE_USN_EXACT = 100
+SCORE_USN_PREFIX = 80
+SCORE_TOKEN_EXACT = 30
+SCORE_TOKEN_PREFIX = 20
+SCORE_TRIGRAM = 10
+
+_search_index = {
+    "version": None,
+    "tokens": [],
+    "postings": {},
+    "trigrams": {},
+    "names": {}
+}
+_search_lock = threading.Lock()
+_search_build_lock = threading.Lock()
+
+_search_stats = {
+    "queries": 0,
+    "rebuilds": 0,
+    "build_ms": 0.0
+}
+
+
+def search_tokens(text):
+
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c))
+
+    return re.findall(r"[0-9A-Z]+", text.upper())
+
+
+def usn_key(text):
+
+    return "".join(search_tokens(text))
+
+
+def trigrams(token):
+
+    return {token[i:i + 3] for i in range(len(token) - 2)}
+
+
+def build_search_index():
+
+    with _student_index_lock:
+
+        version = _student_index_version
+        students = list(_student_index.items())
+
+    start = time.perf_counter()
+
+    postings = {}
+    grams = {}
+    names = {}
+
+    for usn, (student_id, name) in students:
+
+        names[student_id] = name
+
+        for token in set(search_tokens(name)):
+
+            postings.setdefault(token, []).append(student_id)
+
+            for gram in trigrams(token):
+                grams.setdefault(gram, set()).add(student_id)
+
+    index = {
+        "version": version,
+        "tokens": sorted(postings),
+        "postings": postings,
+        "trigrams": grams,
+        "names": names
+    }
+
+    with _search_lock:
+
+        _search_stats["rebuilds"] += 1
+        _search_stats["build_ms"] = round((time.perf_counter() - start) * 1000, 2)
+
+    return index
+
+
+def get_search_index(repo=None):
+
+    global _search_index
+
+    # Same TTL as lookup_student(), reloaded through the caller's
+    # connection rather than a second pooled session
+    age = student_index_age()
+
+    if age is None or age > STUDENT_INDEX_TTL:
+        reload_student_index(repo, STUDENT_INDEX_TTL)
+
+    index = _search_index
+
+    if index["version"] != _student_index_version:
+
+        # One rebuild per index version; later arrivals pick it up
+        with _search_build_lock:
+
+            index = _search_index
+
+            if index["version"] != _student_index_version:
+
+                index = build_search_index()
+                _search_index = index
+
+    return index
+
+
+def match_name_term(index, term):
+
+    scores = {}
+
+    for student_id in index["postings"].get(term, ()):
+        scores[student_id] = SCORE_TOKEN_EXACT
+
+    tokens = index["tokens"]
+    i = bisect.bisect_left(tokens, term)
+
+    while i < len(tokens) and tokens[i].startswith(term):
+
+        if tokens[i] != term:
+
+            for student_id in index["postings"][tokens[i]]:
+                scores.setdefault(student_id, SCORE_TOKEN_PREFIX)
+
+        i += 1
+
+    grams = trigrams(term)
+
+    if grams:
+
+        hits = {}
+
+        for gram in grams:
+
+            for student_id in index["trigrams"].get(gram, ()):
+                hits[student_id] = hits.get(student_id, 0) + 1
+
+        for student_id, count in hits.items():
+
+            ratio = count / len(grams)
+
+            if ratio >= SEARCH_TRIGRAM_MIN and student_id not in scores:
+                scores[student_id] = round(SCORE_TRIGRAM * ratio, 2)
+
+    return scores
+
+
+def rank_students(repo, search):
+
+    # Returns [(student_id, score)] best first; every name term
+    # must match (AND), a USN prefix match stands on its own.
+    index = get_search_index(repo)
+
+    scores = None
+
+    for term in search_tokens(search):
+
+        term_scores = match_name_term(index, term)
+
+        if scores is None:
+            scores = term_scores
+
+        else:
+            scores = {
+                student_id: score + term_scores[student_id]
+                for student_id, score in scores.items()
+                if student_id in term_scores
+            }
+
+    scores = scores or {}
+
+    prefix = usn_key(search)
+
+    if len(prefix) >= 2:
+
+        for student_id, key in repo.usn_prefix_search(prefix, SEARCH_USN_LIMIT):
+
+            score = SCORE_USN_EXACT if key == prefix else SCORE_USN_PREFIX
+            scores[student_id] = max(score, scores.get(student_id, 0))
+
+    names = index["names"]
+
+    with _search_lock:
+        _search_stats["queries"] += 1
+
+    return sorted(
+        scores.items(),
+        key=lambda item: (-item[1], names.get(item[0], ""), item[0])
+    )
+
+
+def search_students(repo, search, limit=None, offset=0):
+
+    # Returns (rows, total); rows are (student_id, name, usn, qr_code)
+    # in rank order, or by name when there is no search term.
+    if not search:
+
+        rows = repo.all_students()
+
+        return rows, len(rows)
+
+    ranked = rank_students(repo, search)
+
+    end = None if limit is None else offset + limit
+    page = ranked[offset:end]
+
+    rows = repo.students_by_id([student_id for student_id, _ in page])
+
+    return rows, len(ranked)
+
+
+@app.route("/api/students/search")
+def api_search_students():
+
+    if "admin" not in session:
+        return jsonify({
+            "success": False,
+            "message": "Unauthorized"
+        }), 401
+
+    query = request.args.get("q", "").strip()
+
+    page = request.args.get("page", 1, type=int)
+    per_page = request.args.get("per_page", SEARCH_PAGE_SIZE, type=int)
+
+    page = max(page, 1)
+    per_page = min(max(per_page, 1), SEARCH_MAX_PAGE_SIZE)
+
+    if not query:
+        return jsonify({
+            "success": False,
+            "message": "Query parameter q is required"
+        }), 400
+
+    try:
+
+        repo = get_repo()
+
+        ranked = rank_students(repo, query)
+        page_ranked = ranked[(page - 1) * per_page:page * per_page]
+
+        scores = dict(page_ranked)
+
+        rows = repo.students_by_id(
+            [student_id for student_id, _ in page_ranked]
+        )
+
+        return jsonify({
+
+            "success": True,
+            "query": query,
+            "page": page,
+            "per_page": per_page,
+            "total": len(ranked),
+
+            "results": [
+                {
+                    "student_id": student_id,
+                    "name": name,
+                    "usn": usn,
+                    "score": scores[student_id],
+                    "qr_url": url_for("qr_image", usn=usn, fmt="png"),
+                    "profile_url": f"/student/{student_id}"
+                }
+                for student_id, name, usn, _ in rows
+            ]
+
+        })
+
+    except Exception as e:
+
+        return jsonify({
+
+            "success": False,
+
+            "message": str(e)
+
+        }), 500
+
+
+# -----------------------------
+# Today's Attendance Bitmap
+# -----------------------------
+# One bit per student_id for students marked today, so scans can
+# answer "already marked" and the dashboard can read today's count
+# without touching attendance. Rebuilt at startup, at day rollover
+# and after TODAY_CACHE_TTL seconds (to pick up marks made by other
+# workers); a set bit is always trustworthy, a clear bit falls back
+# to the database's unique index.
+TODAY_CACHE_TTL = int(os.getenv("TODAY_CACHE_TTL", "60"))
+
+_today = {
+    "day": None,
+    "bits": bytearray(),
+    "count": 0,
+    "loaded": None,
+    "rebuilding": False,
+    # Marks (True) and clears (False) made while a rebuild's query
+    # runs, keyed by (day, student_id); applied on top of its
+    # snapshot so they are not lost when it is swapped in
+    "pending": {}
+}
+_today_lock = threading.Lock()
+
+_today_stats = {
+    "hits": 0,
+    "misses": 0,
+    "cold": 0,
+    "rebuilds": 0
+}
+
+
+def _bit_get(bits, i):
+
+    byte = i >> 3
+
+    return byte < len(bits) and bool(bits[byte] >> (i & 7) & 1)
+
+
+def _bit_set(bits, i):
+
+    byte = i >> 3
+
+    if byte >= len(bits):
+        bits.extend(bytes(byte + 1 - len(bits)))
+
+    if bits[byte] >> (i & 7) & 1:
+        return False
+
+    bits[byte] |= 1 << (i & 7)
+
+    return True
+
+
+def _bit_clear(bits, i):
+
+    byte = i >> 3
+
+    if not _bit_get(bits, i):
+        return False
+
+    bits[byte] &= ~(1 << (i & 7)) & 0xFF
+
+    return True
+
+
+def load_today_attendance():
+
+    day = date.today()
+    bits = bytearray()
+    count = 0
+
+    try:
+
+        with db_backend.session() as repo:
+
+            for student_id in repo.today_student_ids():
+
+                if _bit_set(bits, student_id):
+                    count += 1
+
+        with _today_lock:
+
+            for (pending_day, student_id), marked in _today["pending"].items():
+
+                if pending_day != day:
+                    continue
+
+                if marked:
+                    count += _bit_set(bits, student_id)
+                else:
+                    count -= _bit_clear(bits, student_id)
+
+            _today["day"] = day
+            _today["bits"] = bits
+            _today["count"] = count
+            _today["loaded"] = time.monotonic()
+            _today_stats["rebuilds"] += 1
+
+    finally:
+
+        with _today_lock:
+            _today["rebuilding"] = False
+            _today["pending"] = {}
+
+
+def _today_is_warm():
+
+    return (
+        _today["day"] == date.today()
+        and time.monotonic() - _today["loaded"] <= TODAY_CACHE_TTL
+    )
+
+
+def _ensure_today():
+
+    # Returns True when the bitmap can be trusted for today. A cold
+    # bitmap is rebuilt in the background so the scan that noticed
+    # it is not held up by a full reload.
+    with _today_lock:
+
+        if _today_is_warm():
+            return True
+
+        stale = _today["day"] == date.today()
+
+        if not _today["rebuilding"]:
+
+            _today["rebuilding"] = True
+            _today["pending"] = {}
+
+            threading.Thread(
+                target=load_today_attendance,
+                daemon=True
+            ).start()
+
+        _today_stats["cold"] += 1
+
+    # A stale bitmap for today still only has trustworthy set bits
+    return stale
+
+
+def already_marked_today(student_id):
+
+    if not _ensure_today():
+        return False
+
+    with _today_lock:
+
+        marked = _bit_get(_today["bits"], student_id)
+
+        if marked:
+            _today_stats["hits"] += 1
+        else:
+            _today_stats["misses"] += 1
+
+    return marked
+
+
+def record_mark_today(student_id):
+
+    with _today_lock:
+
+        if _today["rebuilding"]:
+            _today["pending"][(date.today(), student_id)] = True
+
+        if _today["day"] != date.today():
+            return
+
+        if _bit_set(_today["bits"], student_id):
+            _today["count"] += 1
+
+
+def clear_mark_today(student_id):
+
+    with _today_lock:
+
+        if _today["rebuilding"]:
+            _today["pending"][(date.today(), student_id)] = False
+
+        if _bit_clear(_today["bits"], student_id):
+            _today["count"] -= 1
+
+
+def today_attendance_count():
+
+    # None when the bitmap is cold; callers fall back to a query
+    if not _ensure_today():
+        return None
+
+    with _today_lock:
+        return _today["count"]
+
+
+# -----------------------------
+# Session Days
+# -----------------------------
+# A session day is any day with at least one attendance mark. The
+# set is global, so it is loaded once from attendance_daily_summary
+# and shared by every profile view instead of being recounted per
+# student. It is reloaded on day rollover and after
+# SESSION_DAYS_TTL seconds (marks made by other workers); marks made
+# here add their day directly.
+SESSION_DAYS_TTL = int(os.getenv("SESSION_DAYS_TTL", "300"))
+
+_session_days = {
+    "day": None,
+    "days": set(),
+    "loaded": None
+}
+_session_days_lock = threading.Lock()
+_session_days_reload_lock = threading.RLock()
+
+_session_days_stats = {
+    "hits": 0,
+    "reloads": 0
+}
+
+
+def load_session_days(repo=None):
+
+    with _session_days_reload_lock:
+
+        if repo is None:
+
+            with db_backend.session() as repo:
+                days = {day.date() for day in repo.session_days()}
+
+        else:
+            days = {day.date() for day in repo.session_days()}
+
+        with _session_days_lock:
+
+            _session_days["day"] = date.today()
+            _session_days["days"] = days
+            _session_days["loaded"] = time.monotonic()
+            _session_days_stats["reloads"] += 1
+
+
+def session_days_stale():
+
+    loaded = _session_days["loaded"]
+
+    return (
+        _session_days["day"] != date.today()
+        or loaded is None
+        or time.monotonic() - loaded > SESSION_DAYS_TTL
+    )
+
+
+def get_session_days(repo=None):
+
+    # Reloads through the caller's repository so a profile view does
+    # not check out a second connection; one reload per expiry.
+    if session_days_stale():
+
+        with _session_days_reload_lock:
+
+            if session_days_stale():
+                load_session_days(repo)
+
+    else:
+
+        with _session_days_lock:
+            _session_days_stats["hits"] += 1
+
+    return _session_days["days"]
+
+
+def session_day_add(day):
+
+    with _session_days_lock:
+
+        if _session_days["loaded"] is not None:
+            _session_days["days"].add(day)
+
+
+# -----------------------------
+# Cache Warm-up / Stats
+# -----------------------------
+def warm_caches():
+
+    load_student_index()
+    load_today_attendance()
+    load_session_days()
+
+
+def cache_stats():
+
+    with _student_index_lock:
+
+        student_index = dict(_student_index_stats)
+        student_index["size"] = len(_student_index)
+
+    with _today_lock:
+
+        today = dict(_today_stats)
+        today["day"] = _today["day"].isoformat() if _today["day"] else None
+        today["count"] = _today["count"]
+        today["bytes"] = len(_today["bits"])
+
+    with _dashboard_lock:
+        dashboard = dict(_dashboard_stats)
+
+    with _percentage_report_lock:
+
+        percentage_report = dict(_percentage_report_stats)
+        percentage_report["students"] = len(_percentage_report["rows"] or ())
+
+    with _session_days_lock:
+
+        session_days = dict(_session_days_stats)
+        session_days["days"] = len(_session_days["days"])
+
+    with _search_lock:
+
+        search = dict(_search_stats)
+        search["tokens"] = len(_search_index["tokens"])
+        search["trigrams"] = len(_search_index["trigrams"])
+
+    dashboard_stream = dashboard_publisher.snapshot()
+
+    with _qr_cache_lock:
+
+        qr = dict(_qr_cache_stats)
+        qr["entries"] = len(_qr_cache)
+        qr["bytes"] = _qr_cache_bytes
+        qr["max_bytes"] = QR_CACHE_MAX_BYTES
+
+    return {
+        "student_index": student_index,
+        "today": today,
+        "dashboard": dashboard,
+        "dashboard_stream": dashboard_stream,
+        "session_days": session_days,
+        "percentage_report": percentage_report,
+        "search": search,
+        "qr": qr
+    }
+
+
+# -----------------------------
+# Attendance Marking
+# -----------------------------
+# The USN is resolved from the student index, so a scan costs one
+# round trip: Repository.mark_attendance() inserts the row, bumps
+# the daily and monthly rollups and commits. Duplicates are
+# rejected by the unique (student_id, attendance_day) index rather
+# than by a separate COUNT(*) check, so two scanners reading the
+# same QR code at once cannot both insert.
+def mark_student_attendance(repo, usn):
+
+    student = lookup_student(usn, repo)
+
+    if student is None:
+        return MARK_NOT_FOUND, None, None
+
+    student_id, name = student
+
+    if already_marked_today(student_id):
+        return MARK_DUPLICATE, student_id, name
+
+    status = repo.mark_attendance(student_id)
+
+    if status == MARK_NOT_FOUND:
+        student_index_remove(usn)
+        return MARK_NOT_FOUND, None, None
+
+    record_mark_today(student_id)
+
+    if status == MARK_MARKED:
+        session_day_add(date.today())
+        invalidate_dashboard()
+        dashboard_publisher.publish_marks([(name, usn, datetime.now().replace(microsecond=0), "Present")])
+
+    return status, student_id, name
+
+
+@app.route("/mark_attendance/<path:usn>")
+def mark_attendance(usn):
+    
+
+    if "admin" not in session:
+        return redirect("/login")
+
+    usn = unquote(usn)
+
+    if not usn.startswith("STUDENT:"):
+        flash("Invalid QR Code", "danger")
+        return redirect("/scan")
+
+    usn = usn.replace("STUDENT:", "", 1)
+    repo = None
+
+    try:
+
+        repo = get_repo()
+
+        status, student_id, student_name = mark_student_attendance(repo, usn)
+
+        if status == MARK_NOT_FOUND:
+            flash("Student not found!", "danger")
+            return redirect("/scan")
+
+        if status == MARK_DUPLICATE:
+            flash(
+                f"{student_name} has already marked attendance today.",
+                "warning"
+            )
+            return redirect("/")
+
+        flash(
+            f"Attendance marked successfully for {student_name}.",
+            "success"
+        )
+
+    except Exception as e:
+
+        if repo:
+            repo.rollback()
+
+        flash(str(e), "danger")
+
+    return redirect("/")
+
+@app.route("/api/mark_attendance/<path:usn>")
+def api_mark_attendance(usn):
+
+    if "admin" not in session:
+        return jsonify({
+            "success": False,
+            "message": "Unauthorized"
+        })
+
+    usn = unquote(usn)
+
+    if not usn.startswith("STUDENT:"):
+        return jsonify({
+            "success": False,
+            "message": "Invalid QR Code"
+        })
+
+    usn = usn.replace("STUDENT:", "", 1)
+
+    repo = None
+
+    try:
+
+        repo = get_repo()
+
+        status, student_id, student_name = mark_student_attendance(repo, usn)
+
+        if status == MARK_NOT_FOUND:
+
+            return jsonify({
+                "success": False,
+                "message": "Student not found"
+            })
+
+        if status == MARK_DUPLICATE:
+
+            return jsonify({
+                "success": False,
+                "message": f"{student_name} already marked today"
+            })
+
+        return jsonify({
+
+            "success": True,
+
+            "message":
+            f"{student_name} attendance marked"
+
+        })
+
+    except Exception as e:
+
+        if repo:
+            repo.rollback()
+
+        return jsonify({
+
+            "success": False,
+
+            "message": str(e)
+
+        })
+
+
+# -----------------------------
+# Batch Attendance Marking
+# (buffered / offline scanners)
+# -----------------------------
+BATCH_MAX_SCANS = int(os.getenv("BATCH_MAX_SCANS", "500"))
+
+# Buffered scans older than this are rejected rather than written
+# into past days' rollups, session days and percentages
+BATCH_MAX_AGE_HOURS = int(os.getenv("BATCH_MAX_AGE_HOURS", "72"))
+
+# Scanner clocks run a little ahead of the server; times up to this
+# far in the future are taken as "now" instead of rejected
+BATCH_MAX_SKEW_SECONDS = int(os.getenv("BATCH_MAX_SKEW_SECONDS", "120"))
+
+
+def parse_scan_time(value):
+
+    # None means "now"; a bad, future or too-old time raises
+    # ValueError with the per-scan rejection message
+    if not value:
+        return None
+
+    if not isinstance(value, str):
+        raise ValueError("Invalid scan time")
+
+    # toISOString() ends in "Z", which fromisoformat() only accepts
+    # from Python 3.11
+    if value.endswith(("Z", "z")):
+        value = value[:-1] + "+00:00"
+
+    try:
+
+        scanned_at = datetime.fromisoformat(value)
+
+    except ValueError:
+
+        raise ValueError("Invalid scan time")
+
+    # Store in server-local time like SYSDATE does
+    if scanned_at.tzinfo is not None:
+        scanned_at = scanned_at.astimezone().replace(tzinfo=None)
+
+    now = datetime.now()
+
+    if scanned_at > now + timedelta(seconds=BATCH_MAX_SKEW_SECONDS):
+        raise ValueError("Scan time is in the future")
+
+    if scanned_at > now:
+        return None
+
+    if scanned_at < now - timedelta(hours=BATCH_MAX_AGE_HOURS):
+        raise ValueError(f"Scan is older than {BATCH_MAX_AGE_HOURS} hours")
+
+    return scanned_at
+
+
+def lookup_students(usns, repo=None):
+
+    found = {}
+
+    for usn in usns:
+
+        student = lookup_student(usn, repo)
+
+        if student is not None:
+            found[usn] = student
+
+    return found
+
+
+@app.route("/api/mark_attendance/batch", methods=["POST"])
+def api_mark_attendance_batch():
+
+    if "admin" not in session:
+        return jsonify({
+            "success": False,
+            "message": "Unauthorized"
+        })
+
+    body = request.get_json(silent=True)
+
+    # Accept a bare array of scans or {"scanner_id": ..., "scans": [...]}
+    if isinstance(body, dict):
+        scanner_id = body.get("scanner_id")
+        scans = body.get("scans")
+    else:
+        scanner_id = None
+        scans = body
+
+    if not isinstance(scans, list):
+        return jsonify({
+            "success": False,
+            "message": "Expected a JSON array of scans"
+        }), 400
+
+    if len(scans) > BATCH_MAX_SCANS:
+        return jsonify({
+            "success": False,
+            "message": f"At most {BATCH_MAX_SCANS} scans per batch"
+        }), 400
+
+    results = []
+    pending = []
+
+    for index, scan in enumerate(scans):
+
+        if isinstance(scan, str):
+            scan = {"payload": scan}
+
+        payload = scan.get("payload", "") if isinstance(scan, dict) else ""
+
+        result = {
+            "index": index,
+            "payload": payload,
+            "success": False
+        }
+
+        results.append(result)
+
+        if not isinstance(payload, str) or not payload.startswith("STUDENT:"):
+            result["status"] = "INVALID"
+            result["message"] = "Invalid QR Code"
+            continue
+
+        result["usn"] = payload.replace("STUDENT:", "", 1)
+
+        try:
+
+            scanned_at = parse_scan_time(scan.get("scanned_at"))
+
+        except ValueError as e:
+
+            result["status"] = "REJECTED"
+            result["message"] = str(e)
+            continue
+
+        pending.append((result, scanned_at))
+
+    repo = None
+
+    try:
+
+        if pending:
+
+            repo = get_repo()
+
+            students = lookup_students(
+                {result["usn"] for result, _ in pending},
+                repo
+            )
+
+            rows = []
+            inserted = []
+
+            for result, scanned_at in pending:
+
+                student = students.get(result["usn"])
+
+                if student is None:
+                    result["status"] = MARK_NOT_FOUND
+                    result["message"] = "Student not found"
+                    continue
+
+                result["name"] = student[1]
+
+                today = scanned_at is None or scanned_at.date() == date.today()
+
+                if today and already_marked_today(student[0]):
+                    result["status"] = MARK_DUPLICATE
+                    result["message"] = f"{student[1]} already marked today"
+                    continue
+
+                rows.append({
+                    "student_id": student[0],
+                    "marked_at": scanned_at
+                })
+                inserted.append((
+                    result,
+                    student[0],
+                    scanned_at.date() if scanned_at else date.today()
+                ))
+
+            if rows:
+
+                statuses = repo.mark_attendance_batch(rows)
+
+                marked = []
+                now = datetime.now().replace(microsecond=0)
+
+                for (result, student_id, day), row, status in zip(inserted, rows, statuses):
+
+                    result["status"] = status
+
+                    today = day == date.today()
+
+                    if result["status"] == MARK_MARKED:
+                        result["success"] = True
+                        result["message"] = f"{result['name']} attendance marked"
+                        marked.append((result["name"], result["usn"], row["marked_at"] or now, "Present"))
+
+                        session_day_add(day)
+
+                        if today:
+                            record_mark_today(student_id)
+
+                    elif result["status"] == MARK_DUPLICATE:
+
+                        if today:
+                            result["message"] = f"{result['name']} already marked today"
+                        else:
+                            result["message"] = f"{result['name']} already marked on {day.isoformat()}"
+
+                        if today:
+                            record_mark_today(student_id)
+
+                    else:
+                        student_index_remove(result["usn"])
+                        result["message"] = "Student not found"
+
+                if marked:
+                    invalidate_dashboard()
+                    dashboard_publisher.publish_marks(marked)
+
+        return jsonify({
+
+            "success": True,
+
+            "scanner_id": scanner_id,
+
+            "marked": sum(1 for r in results if r["success"]),
+
+            "results": results
+
+        })
+
+    except Exception as e:
+
+        if repo:
+            repo.rollback()
+
+        return jsonify({
+
+            "success": False,
+
+            "message": str(e)
+
+        }), 500
+
+
+# -----------------------------
+# Students List
+# -----------------------------
+# The roster is paged by keyset on (name, student_id), served by
+# students_name_idx (migration 005), with after/before cursors like
+# /attendance. Searches are ranked in memory, so they page by number.
+# Rows show QR_THUMB_SIZE thumbnails loaded lazily; the full-size
+# image is only fetched when a thumbnail is clicked.
+STUDENTS_PAGE_SIZE = int(os.getenv("STUDENTS_PAGE_SIZE", "50"))
+STUDENTS_MAX_PAGE_SIZE = 200
+
+QR_THUMB_SIZE = 3
+
+
+def encode_name_cursor(name, student_id):
+
+    token = f"{student_id}~{name}"
+
+    return base64.urlsafe_b64encode(token.encode()).decode()
+
+
+def decode_name_cursor(token):
+
+    try:
+
+        student_id, name = base64.urlsafe_b64decode(token.encode()).decode().split("~", 1)
+
+        return name, int(student_id)
+
+    except (ValueError, UnicodeDecodeError):
+
+        return None
+
+
+def list_students_page(repo, limit, after=None, before=None):
+
+    # Returns (rows, has_prev, has_next) for one keyset page
+    rows = repo.students_page(limit + 1, after, before)
+
+    more = len(rows) > limit
+    rows = rows[:limit]
+
+    if before:
+        rows.reverse()
+
+    has_next = more if not before else True
+    has_prev = more if before else bool(after)
+
+    return rows, has_prev, has_next
+
+
+@app.route("/students")
+def students():
+
+    if "admin" not in session:
+        return redirect("/login")
+
+    search = request.args.get("search", "").strip()
+
+    limit = request.args.get("limit", STUDENTS_PAGE_SIZE, type=int)
+    limit = max(1, min(limit, STUDENTS_MAX_PAGE_SIZE))
+
+    query = {"search": search} if search else {}
+
+    if limit != STUDENTS_PAGE_SIZE:
+        query["limit"] = limit
+
+    try:
+
+        repo = get_repo()
+
+        next_url = None
+        prev_url = None
+
+        if search:
+
+            page = max(request.args.get("page", 1, type=int), 1)
+            offset = (page - 1) * limit
+
+            students, total = search_students(repo, search, limit=limit, offset=offset)
+
+            if page > 1:
+                prev_url = url_for("students", page=page - 1, **query)
+
+            if offset + limit < total:
+                next_url = url_for("students", page=page + 1, **query)
+
+        else:
+
+            offset = 0
+
+            after = decode_name_cursor(request.args.get("after", ""))
+            before = None if after else decode_name_cursor(request.args.get("before", ""))
+
+            students, has_prev, has_next = list_students_page(repo, limit, after, before)
+
+            total = repo.count_students()
+
+            if students and has_next:
+                next_url = url_for(
+                    "students",
+                    after=encode_name_cursor(students[-1][1], students[-1][0]),
+                    **query
+                )
+
+            if students and has_prev:
+                prev_url = url_for(
+                    "students",
+                    before=encode_name_cursor(students[0][1], students[0][0]),
+                    **query
+                )
+
+        return render_template(
+
+            "students.html",
+
+            students=students,
+
+            total=total,
+
+            offset=offset,
+
+            search=search,
+
+            thumb_size=QR_THUMB_SIZE,
+
+            next_url=next_url,
+
+            prev_url=prev_url
+
+        )
+    except Exception as e:
+
+        flash(f"Database Error: {str(e)}", "danger")
+        return redirect("/")
+
+            
+# -----------------------------
+# ID Card Sheets
+# -----------------------------
+# Cards are laid out 2 x 5 per A4 page (CR80 size). QR codes are
+# drawn as vector rectangles from the module matrix rather than
+# embedded PNGs, which keeps 1,000-card sheets small; matrices for
+# large selections are computed in the shared QR process pool.
+ID_CARD_MAX = int(os.getenv("ID_CARD_MAX", "2000"))
+ID_CARD_PARALLEL_MIN = 100
+
+ID_CARD_WIDTH = 85.6 * mm
+ID_CARD_HEIGHT = 54 * mm
+ID_CARD_COLUMNS = 2
+ID_CARD_ROWS = 5
+
+
+def draw_qr_matrix(pdf, matrix, x, y, size):
+
+    # Emitted as raw path operators in module units (one "re" per
+    # horizontal run of dark modules) under a single scale transform;
+    # going through canvas.rect() per module costs far more in
+    # number formatting than the drawing itself.
+    count = len(matrix)
+    module = size / count
+
+    ops = [f"q {module:.5f} 0 0 {module:.5f} {x:.3f} {y:.3f} cm"]
+
+    for r, row in enumerate(matrix):
+
+        top = count - 1 - r
+        c = 0
+
+        while c < count:
+
+            if not row[c]:
+                c += 1
+                continue
+
+            start = c
+
+            while c < count and row[c]:
+                c += 1
+
+            ops.append(f"{start} {top} {c - start} 1 re")
+
+    ops.append("f Q")
+
+    pdf.addLiteral("\n".join(ops))
+
+
+def draw_id_card(pdf, student, matrix, x, y):
+
+    _, name, usn = student
+
+    pdf.setStrokeColor(colors.darkblue)
+    pdf.setLineWidth(1)
+    pdf.roundRect(x, y, ID_CARD_WIDTH, ID_CARD_HEIGHT, 3 * mm, stroke=1, fill=0)
+
+    # Header band
+    pdf.setFillColor(colors.darkblue)
+    pdf.rect(x, y + ID_CARD_HEIGHT - 10 * mm, ID_CARD_WIDTH, 10 * mm, stroke=0, fill=1)
+
+    pdf.setFillColor(colors.white)
+    pdf.setFont("Helvetica-Bold", 10)
+    pdf.drawString(x + 4 * mm, y + ID_CARD_HEIGHT - 6.5 * mm, "STUDENT ID CARD")
+
+    pdf.setFillColor(colors.black)
+    pdf.setFont("Helvetica-Bold", 11)
+
+    # Keep long names inside the text column
+    label = name
+
+    while label and pdf.stringWidth(label, "Helvetica-Bold", 11) > 42 * mm:
+        label = label[:-1]
+
+    if label != name:
+        label = label[:-1] + "…"
+
+    pdf.drawString(x + 4 * mm, y + 30 * mm, label)
+
+    pdf.setFont("Helvetica", 10)
+    pdf.drawString(x + 4 * mm, y + 24 * mm, usn)
+
+    qr_size = 36 * mm
+
+    draw_qr_matrix(pdf, matrix, x + ID_CARD_WIDTH - qr_size - 4 * mm, y + 4 * mm, qr_size)
+
+
+@timed_render("id_cards_pdf")
+def build_id_cards_pdf(output, students, matrices):
+
+    pdf = canvas.Canvas(output, pagesize=A4)
+    pdf.setTitle("Student ID Cards")
+
+    page_width, page_height = A4
+
+    gap_x = (page_width - ID_CARD_COLUMNS * ID_CARD_WIDTH) / (ID_CARD_COLUMNS + 1)
+    gap_y = (page_height - ID_CARD_ROWS * ID_CARD_HEIGHT) / (ID_CARD_ROWS + 1)
+
+    per_page = ID_CARD_COLUMNS * ID_CARD_ROWS
+
+    for i, (student, matrix) in enumerate(zip(students, matrices)):
+
+        slot = i % per_page
+
+        if i and slot == 0:
+            pdf.showPage()
+
+        column = slot % ID_CARD_COLUMNS
+        row = slot // ID_CARD_COLUMNS
+
+        x = gap_x + column * (ID_CARD_WIDTH + gap_x)
+        y = page_height - (row + 1) * (ID_CARD_HEIGHT + gap_y)
+
+        draw_id_card(pdf, student, matrix, x, y)
+
+    pdf.save()
+
+
+def qr_matrices(usns):
+
+    if len(usns) < ID_CARD_PARALLEL_MIN:
+        return qr_matrix_chunk(usns)
+
+    pool = get_qr_process_pool()
+
+    chunks = [
+        usns[i:i + QR_CHUNK_SIZE]
+        for i in range(0, len(usns), QR_CHUNK_SIZE)
+    ]
+
+    matrices = []
+
+    # map() keeps chunk order
+    for chunk in pool.map(qr_matrix_chunk, chunks):
+        matrices.extend(chunk)
+
+    return matrices
+
+
+@app.route("/students/id_cards")
+def student_id_cards():
+
+    if "admin" not in session:
+        return redirect("/login")
+
+    ids = set()
+
+    for value in request.args.getlist("ids"):
+
+        for part in value.split(","):
+
+            if part.strip().isdigit():
+                ids.add(int(part))
+
+    search = request.args.get("search", "").strip()
+
+    try:
+
+        if ids:
+
+            # An explicit selection: fetch just those students
+            if len(ids) > ID_CARD_MAX:
+                flash(f"At most {ID_CARD_MAX} ID cards per sheet.", "warning")
+                return redirect("/students")
+
+            rows = sorted(
+                get_repo().students_by_id(sorted(ids)),
+                key=lambda row: (row[1], row[0])
+            )
+
+        else:
+
+            rows, _ = search_students(get_repo(), search)
+
+        students = [(row[0], row[1], row[2]) for row in rows]
+
+        if not students:
+            flash("No students selected for ID cards.", "warning")
+            return redirect("/students")
+
+        if len(students) > ID_CARD_MAX:
+            flash(f"At most {ID_CARD_MAX} ID cards per sheet.", "warning")
+            return redirect("/students")
+
+        start = time.perf_counter()
+
+        matrices = qr_matrices([usn for _, _, usn in students])
+
+        output = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+
+        build_id_cards_pdf(output, students, matrices)
+
+        output.seek(0)
+
+        app.logger.info(
+            "ID cards: %d card(s) in %.0f ms",
+            len(students),
+            (time.perf_counter() - start) * 1000
+        )
+
+        return send_file(
+
+            output,
+
+            as_attachment=True,
+
+            download_name="Student_ID_Cards.pdf",
+
+            mimetype="application/pdf"
+
+        )
+
+    except Exception as e:
+
+        flash(f"Error: {str(e)}", "danger")
+
+        return redirect("/students")
+
+
+@app.route("/delete_student/<int:id>", methods=["POST"])
+def delete_student(id):
+
+    if "admin" not in session:
+        return redirect("/login")
+
+    repo = None
+
+    try:
+
+        repo = get_repo()
+
+        # Get QR code path
+        student = repo.get_student(id)
+
+        # Delete QR image file
+        if student and student[3]:
+
+            file_path = os.path.join(
+                app.static_folder,
+                student[3]
+            )
+
+            if os.path.exists(file_path):
+                os.remove(file_path)
+
+        # Rollups, attendance records, then the student record
+        repo.delete_student(id)
+
+        repo.commit()
+
+        if student:
+            student_index_remove(student[2])
+            clear_mark_today(id)
+
+        invalidate_dashboard()
+
+        flash(
+            "Student deleted successfully!",
+            "success"
+        )
+
+    except Exception as e:
+
+        if repo:
+            repo.rollback()
+
+        flash(
+            f"Error deleting student: {str(e)}",
+            "danger"
+        )
+
+    return redirect("/students")
+#------------------------------
+# Edit Student
+#------------------------------
+@app.route("/edit_student/<int:id>", methods=["GET", "POST"])
+def edit_student(id):
+
+    if "admin" not in session:
+        return redirect("/login")
+
+    repo = None
+
+    try:
+
+        repo = get_repo()
+
+        # -----------------------------
+        # GET Request
+        # -----------------------------
+        if request.method == "GET":
+
+            student = repo.get_student(id)
+
+            if not student:
+                flash("Student not found.", "danger")
+                return redirect("/students")
+
+            return render_template(
+                "edit_student.html",
+                student=student
+            )
+
+        # -----------------------------
+        # POST Request
+        # -----------------------------
+
+        new_name = request.form["name"].strip()
+        new_usn = request.form["usn"].strip().upper()
+
+        # Get existing student
+        old_student = repo.get_student(id)
+
+        if not old_student:
+
+            flash("Student not found.", "danger")
+            return redirect("/students")
+
+        old_usn = old_student[2]
+        old_qr = old_student[3]
+
+        # Check duplicate USN
+        if repo.usn_taken(new_usn, exclude_id=id):
+
+            flash("USN already exists.", "warning")
+
+            return redirect(f"/edit_student/{id}")
+
+        # If USN changed, replace the QR image
+
+        qr_path = old_qr
+
+        if old_usn != new_usn:
+
+            # Delete old QR
+
+            if old_qr:
+
+                old_path = os.path.join(
+                    app.static_folder,
+                    old_qr
+                )
+
+                if os.path.exists(old_path):
+                    os.remove(old_path)
+
+            qr_path = None
+
+            if QR_STATIC_FILES:
+
+                write_qr_png(new_usn, qr_folder())
+
+                qr_path = qr_db_path(new_usn)
+
+        # Update student
+
+        repo.update_student(id, new_name, new_usn, qr_path)
+
+        repo.commit()
+
+        student_index_remove(old_usn)
+        student_index_put(new_usn, id, new_name)
+        invalidate_dashboard()
+
+        flash(
+            "Student updated successfully!",
+            "success"
+        )
+
+        return redirect("/students")
+
+    except Exception as e:
+
+        if repo:
+            repo.rollback()
+
+        flash(
+            f"Error: {str(e)}",
+            "danger"
+        )
+
+        return redirect("/students")
+
+# -----------------------------
+# Attendance Filters
+# -----------------------------
+ATTENDANCE_PAGE_SIZE = int(os.getenv("ATTENDANCE_PAGE_SIZE", "50"))
+ATTENDANCE_MAX_PAGE_SIZE = int(os.getenv("ATTENDANCE_MAX_PAGE_SIZE", "200"))
+
+
+def parse_filter_date(value):
+
+    try:
+        return datetime.strptime(value, "%Y-%m-%d")
+    except (TypeError, ValueError):
+        return None
+
+
+def attendance_filters(args):
+
+    # Returns the parsed criteria for the repository (which builds
+    # the WHERE clause for its dialect) and the cleaned filter
+    # values (for echoing back into forms and links)
+    filters = {
+        "from_date": args.get("from_date", "").strip(),
+        "to_date": args.get("to_date", "").strip(),
+        "usn_prefix": args.get("usn_prefix", "").strip().upper().replace("%", "").replace("_", ""),
+        "usn": args.get("usn", "").strip().upper(),
+        "status": args.get("status", "").strip()
+    }
+
+    from_date = parse_filter_date(filters["from_date"])
+    to_date = parse_filter_date(filters["to_date"])
+
+    if not from_date:
+        filters["from_date"] = ""
+
+    if not to_date:
+        filters["to_date"] = ""
+
+    # A class is identified by its USN prefix (college, year,
+    # branch), e.g. 1MV23CS
+    criteria = {
+        "from_date": from_date,
+        "to_date": to_date,
+        "usn_prefix": filters["usn_prefix"],
+        "usn": filters["usn"],
+        "status": filters["status"]
+    }
+
+    return criteria, filters
+
+
+# -----------------------------
+# Keyset Cursors
+# (date_attended, row key: ROWID on Oracle, rowid on SQLite)
+# -----------------------------
+def encode_cursor(when, rowid):
+
+    token = f"{when.strftime('%Y%m%d%H%M%S')}~{rowid}"
+
+    return base64.urlsafe_b64encode(token.encode()).decode()
+
+
+def decode_cursor(token):
+
+    try:
+
+        when, rowid = base64.urlsafe_b64decode(token.encode()).decode().split("~", 1)
+
+        return datetime.strptime(when, "%Y%m%d%H%M%S"), rowid
+
+    except (ValueError, UnicodeDecodeError):
+
+        return None
+
+
+# -----------------------------
+# View Attendance
+# -----------------------------
+@app.route("/attendance")
+def view_attendance():
+
+    # Check login
+    if "admin" not in session:
+        return redirect("/login")
+
+    criteria, filters = attendance_filters(request.args)
+
+    limit = request.args.get("limit", ATTENDANCE_PAGE_SIZE, type=int)
+    limit = max(1, min(limit, ATTENDANCE_MAX_PAGE_SIZE))
+
+    after = decode_cursor(request.args.get("after", ""))
+    before = None if after else decode_cursor(request.args.get("before", ""))
+
+    try:
+
+        # Walking backwards ("before") reads the newer rows in
+        # ascending order; they are flipped below, so both
+        # directions use the same index
+        records = get_repo().attendance_page(
+            criteria,
+            limit + 1,
+            after,
+            before
+        )
+
+        more = len(records) > limit
+        records = records[:limit]
+
+        if before:
+            records.reverse()
+
+        # "more" means more rows in the direction we walked
+        has_next = more if not before else True
+        has_prev = more if before else bool(after)
+
+        next_cursor = None
+        prev_cursor = None
+
+        if records:
+
+            if has_next:
+                next_cursor = encode_cursor(records[-1][2], records[-1][4])
+
+            if has_prev:
+                prev_cursor = encode_cursor(records[0][2], records[0][4])
+
+        query = {k: v for k, v in filters.items() if v}
+
+        if limit != ATTENDANCE_PAGE_SIZE:
+            query["limit"] = limit
+
+        return render_template(
+            "view_attendance.html",
+            records=records,
+            filters=filters,
+            export_args={k: v for k, v in filters.items() if v},
+            limit=limit,
+            next_url=url_for("view_attendance", after=next_cursor, **query) if next_cursor else None,
+            prev_url=url_for("view_attendance", before=prev_cursor, **query) if prev_cursor else None
+        )
+
+    except Exception as e:
+
+        flash(
+            f"Database Error: {str(e)}",
+            "danger"
+        )
+
+        return redirect("/")
+
+
+# -----------------------------
+# Export Query
+# -----------------------------
+# Exports read the same filters as /attendance and pull rows in
+# EXPORT_FETCH_SIZE batches rather than fetchall().
+EXPORT_FETCH_SIZE = int(os.getenv("EXPORT_FETCH_SIZE", "1000"))
+
+# Rows looked at to size the Excel columns
+EXCEL_WIDTH_SAMPLE = 200
+
+
+XLSX_HEADER = [
+    "Student Name",
+    "USN",
+    "Date",
+    "Status"
+]
+
+
+@timed_render("xlsx")
+def build_attendance_xlsx(output, batches, header=XLSX_HEADER, title="Attendance"):
+
+    first = next(batches, [])
+
+    # Write-only worksheets stream rows straight to the file, so
+    # column widths are estimated from the header and a sample
+    # before any row is written
+    widths = [len(title) for title in header]
+
+    for row in first[:EXCEL_WIDTH_SAMPLE]:
+
+        for i, value in enumerate(row):
+            widths[i] = max(widths[i], len(str(value)))
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title)
+
+    for i, width in enumerate(widths):
+        ws.column_dimensions[get_column_letter(i + 1)].width = width + 3
+
+    # Bold header
+    bold = Font(bold=True)
+    header_cells = []
+
+    for title in header:
+
+        cell = WriteOnlyCell(ws, value=title)
+        cell.font = bold
+        header_cells.append(cell)
+
+    ws.append(header_cells)
+
+    # Data
+    for row in first:
+        ws.append(row)
+
+    for rows in batches:
+
+        for row in rows:
+            ws.append(row)
+
+    wb.save(output)
+
+
+# -----------------------------
+# PDF Export
+# -----------------------------
+# Rows are drawn page by page straight onto a canvas: each page
+# gets its own fixed-height table slice with the header repeated,
+# so layout cost stays linear and finished pages are not kept in
+# memory the way one huge platypus Table would be.
+PDF_ROW_HEIGHT = 18
+
+PDF_HEADER = ["Name", "USN", "Date", "Status"]
+
+PDF_TABLE_STYLE = TableStyle([
+
+    ("BACKGROUND", (0, 0), (-1, 0), colors.darkblue),
+
+    ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
+
+    ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+
+    ("GRID", (0, 0), (-1, -1), 1, colors.grey),
+
+    ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+
+    ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+
+    ("BACKGROUND", (0, 1), (-1, -1), colors.beige)
+
+])
+
+
+def describe_filters(filters):
+
+    parts = []
+
+    if filters["from_date"] or filters["to_date"]:
+        parts.append(
+            f"Dates: {filters['from_date'] or '...'} to {filters['to_date'] or '...'}"
+        )
+
+    if filters["usn_prefix"]:
+        parts.append(f"Class: {filters['usn_prefix']}*")
+
+    if filters["usn"]:
+        parts.append(f"USN: {filters['usn']}")
+
+    if filters["status"]:
+        parts.append(f"Status: {filters['status']}")
+
+    return " | ".join(parts)
+
+
+@timed_render("pdf")
+def build_attendance_pdf(output, batches, filters):
+
+    # Returns the number of pages written
+    pdf = canvas.Canvas(output, pagesize=A4)
+
+    page_width, page_height = A4
+    frame_width = page_width - 2 * inch
+    top = page_height - inch
+    bottom = inch
+
+    styles = getSampleStyleSheet()
+
+    heading = [
+        Paragraph("<b>Student Attendance Report</b>", styles["Title"]),
+        Paragraph("Generated by Student Attendance Management System", styles["Normal"])
+    ]
+
+    description = describe_filters(filters)
+
+    if description:
+        heading.append(Paragraph(escape(description), styles["Normal"]))
+
+    y = top
+
+    for paragraph in heading:
+
+        _, height = paragraph.wrapOn(pdf, frame_width, y - bottom)
+        paragraph.drawOn(pdf, inch, y - height)
+        y -= height
+
+    y -= 0.3 * inch
+
+    pages = 0
+
+    def draw_page(rows, y):
+
+        table = Table(
+            [PDF_HEADER] + rows,
+            rowHeights=PDF_ROW_HEIGHT,
+            repeatRows=1
+        )
+
+        table.setStyle(PDF_TABLE_STYLE)
+
+        width, height = table.wrapOn(pdf, frame_width, y - bottom)
+        table.drawOn(pdf, inch + (frame_width - width) / 2, y - height)
+
+        pdf.setFont("Helvetica", 8)
+        pdf.drawCentredString(page_width / 2, bottom / 2, f"Page {pages + 1}")
+
+        pdf.showPage()
+
+    # One row of each page is the header
+    capacity = int((y - bottom) // PDF_ROW_HEIGHT) - 1
+    page_rows = []
+
+    for rows in batches:
+
+        for row in rows:
+
+            page_rows.append([
+                row[0],
+                row[1],
+                row[2].strftime("%d-%m-%Y %H:%M"),
+                row[3]
+            ])
+
+            if len(page_rows) == capacity:
+
+                draw_page(page_rows, y)
+                pages += 1
+
+                page_rows = []
+                y = top
+                capacity = int((y - bottom) // PDF_ROW_HEIGHT) - 1
+
+    if page_rows or pages == 0:
+        draw_page(page_rows, y)
+        pages += 1
+
+    pdf.save()
+
+    return pages
+
+
+# -----------------------------
+# Export Jobs
+# -----------------------------
+# Large reports are built off-request by a small worker pool so
+# they do not hold a Flask worker (and its pooled session) for the
+# whole render. Finished files live in EXPORT_RESULTS_DIR and are
+# removed EXPORT_RESULT_TTL seconds after they complete.
+EXPORT_WORKERS = int(os.getenv("EXPORT_WORKERS", "2"))
+EXPORT_RESULT_TTL = int(os.getenv("EXPORT_RESULT_TTL", "3600"))
+EXPORT_RESULTS_DIR = os.getenv(
+    "EXPORT_RESULTS_DIR",
+    os.path.join(app.instance_path, "exports")
+)
+
+EXPORT_FORMATS = {
+    "pdf": ("application/pdf", "Attendance_Report.pdf"),
+    "xlsx": (
+        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        "Attendance_Report.xlsx"
+    )
+}
+
+_export_executor = ThreadPoolExecutor(
+    max_workers=EXPORT_WORKERS,
+    thread_name_prefix="export"
+)
+
+_export_jobs = {}
+_export_jobs_lock = threading.Lock()
+
+
+def export_job_view(job):
+
+    view = {
+        "id": job["id"],
+        "format": job["format"],
+        "filters": job["filters"],
+        "status": job["status"],
+        "owner": job["owner"],
+        "created": job["created"].isoformat(timespec="seconds"),
+        "finished": job["finished"].isoformat(timespec="seconds") if job["finished"] else None,
+        "elapsed_ms": job["elapsed_ms"],
+        "pages": job["pages"],
+        "error": job["error"]
+    }
+
+    if job["status"] == "done":
+        view["download_url"] = url_for("download_export_job", job_id=job["id"])
+
+    return view
+
+
+def run_export_job(job_id):
+
+    with _export_jobs_lock:
+        job = _export_jobs[job_id]
+        job["status"] = "running"
+
+    start = time.perf_counter()
+    path = os.path.join(EXPORT_RESULTS_DIR, f"{job_id}.{job['format']}")
+
+    try:
+
+        criteria, filters = attendance_filters(job["filters"])
+
+        with db_backend.session() as repo:
+
+            batches = repo.attendance_export(criteria, EXPORT_FETCH_SIZE)
+
+            with open(path, "wb") as output:
+
+                if job["format"] == "pdf":
+                    job["pages"] = build_attendance_pdf(output, batches, filters)
+                else:
+                    build_attendance_xlsx(output, batches)
+
+        status = "done"
+        error = None
+
+    except Exception as e:
+
+        if os.path.exists(path):
+            os.remove(path)
 
-        # Mark attendance
-        cur.execute("""
-            INSERT INTO attendance
-            (
-                student_id,
-                date_attended,
-                status
-            )
-            VALUES
-            (
-                :1,
-                SYSDATE,
-                'Present'
-            )
-        """, (student_id,))
+        status = "failed"
+        error = str(e)
 
-        conn.commit()
+    with _export_jobs_lock:
 
-        return jsonify({
+        job["status"] = status
+        job["error"] = error
+        job["path"] = path if status == "done" else None
+        job["finished"] = datetime.now()
+        job["elapsed_ms"] = round((time.perf_counter() - start) * 1000)
 
-            "success": True,
 
-            "message":
-            f"{student_name} attendance marked"
+def cleanup_export_jobs():
 
-        })
+    now = datetime.now()
 
-    except Exception as e:
+    with _export_jobs_lock:
 
-        if conn:
-            conn.rollback()
+        expired = [
+            job for job in _export_jobs.values()
+            if job["finished"]
+            and (now - job["finished"]).total_seconds() > EXPORT_RESULT_TTL
+        ]
 
-        return jsonify({
+        for job in expired:
+            del _export_jobs[job["id"]]
 
-            "success": False,
+    for job in expired:
 
-            "message": str(e)
+        if job["path"] and os.path.exists(job["path"]):
+            os.remove(job["path"])
 
-        })
+    # Files left behind by a previous process
+    cutoff = time.time() - EXPORT_RESULT_TTL
 
-    finally:
+    for filename in os.listdir(EXPORT_RESULTS_DIR):
 
-        if cur:
-            cur.close()
+        path = os.path.join(EXPORT_RESULTS_DIR, filename)
 
-        if conn:
-            conn.close()
+        if os.path.isfile(path) and os.path.getmtime(path) < cutoff:
+            os.remove(path)
 
-@app.route("/students")
-def students():
+
+@app.route("/export/jobs", methods=["POST"])
+def create_export_job():
 
     if "admin" not in session:
-        return redirect("/login")
+        return jsonify({
+            "success": False,
+            "message": "Unauthorized"
+        }), 401
 
-    search = request.args.get("search", "").strip()
+    params = request.get_json(silent=True) or request.form.to_dict()
 
-    conn = None
-    cur = None
+    export_format = params.get("format", "")
 
-    try:
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({
+            "success": False,
+            "message": "format must be 'pdf' or 'xlsx'"
+        }), 400
 
-        conn = get_db()
-        cur = conn.cursor()
+    os.makedirs(EXPORT_RESULTS_DIR, exist_ok=True)
 
-        if search:
+    cleanup_export_jobs()
 
-            cur.execute("""
+    _, filters = attendance_filters(params)
 
-                SELECT
-                    student_id,
-                    name,
-                    usn,
-                    qr_code
+    job = {
+        "id": uuid.uuid4().hex,
+        "format": export_format,
+        "filters": {k: v for k, v in filters.items() if v},
+        "status": "queued",
+        "owner": session["admin"],
+        "created": datetime.now(),
+        "finished": None,
+        "elapsed_ms": None,
+        "pages": None,
+        "path": None,
+        "error": None
+    }
 
-                FROM students
+    view = export_job_view(job)
 
-                WHERE
+    with _export_jobs_lock:
+        _export_jobs[job["id"]] = job
 
-                    UPPER(name) LIKE UPPER(:1)
+    _export_executor.submit(run_export_job, job["id"])
 
-                    OR
+    return jsonify({
 
-                    UPPER(usn) LIKE UPPER(:1)
+        "success": True,
 
-                ORDER BY name
+        "job": view,
 
-            """, (f"%{search}%",))
+        "status_url": url_for("export_job_status", job_id=job["id"])
 
-        else:
+    }), 202
 
-            cur.execute("""
 
-                SELECT
-                    student_id,
-                    name,
-                    usn,
-                    qr_code
+@app.route("/export/jobs")
+def list_export_jobs():
+
+    if "admin" not in session:
+        return jsonify({
+            "success": False,
+            "message": "Unauthorized"
+        }), 401
 
-                FROM students
+    with _export_jobs_lock:
 
-                ORDER BY name
+        jobs = [
+            export_job_view(job)
+            for job in sorted(
+                _export_jobs.values(),
+                key=lambda job: job["created"],
+                reverse=True
+            )
+        ]
 
-            """)
+    return jsonify({
+        "success": True,
+        "jobs": jobs
+    })
 
-        students = cur.fetchall()
 
-        return render_template(
+@app.route("/export/jobs/<job_id>")
+def export_job_status(job_id):
 
-            "students.html",
+    if "admin" not in session:
+        return jsonify({
+            "success": False,
+            "message": "Unauthorized"
+        }), 401
 
-            students=students,
+    with _export_jobs_lock:
 
-            search=search
+        job = _export_jobs.get(job_id)
 
-        )
-    except Exception as e:
+        if job is None:
+            return jsonify({
+                "success": False,
+                "message": "Job not found"
+            }), 404
 
-        flash(f"Database Error: {str(e)}", "danger")
-        return redirect("/")
+        view = export_job_view(job)
 
-    finally:
+    return jsonify({
+        "success": True,
+        "job": view
+    })
 
-        if cur:
-            cur.close()
 
-        if conn:
-            conn.close()
-            
-@app.route("/delete_student/<int:id>", methods=["POST"])
-def delete_student(id):
+@app.route("/export/jobs/<job_id>/download")
+def download_export_job(job_id):
 
     if "admin" not in session:
         return redirect("/login")
 
-    conn = None
-    cur = None
+    with _export_jobs_lock:
+        job = _export_jobs.get(job_id)
 
-    try:
-
-        conn = get_db()
-        cur = conn.cursor()
-
-        # Get QR code path
-        cur.execute(
-            """
-            SELECT qr_code
-            FROM students
-            WHERE student_id = :1
-            """,
-            (id,)
-        )
+    if job is None or job["status"] != "done" or not os.path.exists(job["path"]):
+        flash("Export not found or expired.", "warning")
+        return redirect("/attendance")
 
-        row = cur.fetchone()
+    mimetype, download_name = EXPORT_FORMATS[job["format"]]
 
-        # Delete QR image file
-        if row and row[0]:
+    return send_file(
+        job["path"],
+        as_attachment=True,
+        download_name=download_name,
+        mimetype=mimetype
+    )
 
-            file_path = os.path.join(
-                app.static_folder,
-                row[0]
-            )
 
-            if os.path.exists(file_path):
-                os.remove(file_path)
+# -----------------------------
+# Export Cache
+# -----------------------------
+# Synchronous exports are cached on disk under an ETag made of the
+# format + filters and a high-water mark of the data (rollup row
+# count, newest mark, newest roster change). Until attendance or
+# the roster changes, repeat downloads are served from disk or
+# answered with 304 Not Modified; any new mark changes the key.
+EXPORT_CACHE_DIR = os.getenv(
+    "EXPORT_CACHE_DIR",
+    os.path.join(app.instance_path, "export_cache")
+)
+EXPORT_CACHE_TTL = int(os.getenv("EXPORT_CACHE_TTL", "86400"))
 
-        # Delete attendance records first
-        cur.execute(
-            """
-            DELETE FROM attendance
-            WHERE student_id = :1
-            """,
-            (id,)
-        )
+def export_cache_key(export_format, filters, hwm):
 
-        # Delete student record
-        cur.execute(
-            """
-            DELETE FROM students
-            WHERE student_id = :1
-            """,
-            (id,)
-        )
+    active = {k: v for k, v in filters.items() if v}
 
-        conn.commit()
+    scope = hashlib.sha256(
+        json.dumps([export_format, active], sort_keys=True).encode()
+    ).hexdigest()[:16]
 
-        flash(
-            "Student deleted successfully!",
-            "success"
-        )
+    version = hashlib.sha256(
+        "|".join(str(part) for part in hwm).encode()
+    ).hexdigest()[:16]
 
-    except Exception as e:
+    return scope, f"{scope}-{version}"
 
-        if conn:
-            conn.rollback()
 
-        flash(
-            f"Error deleting student: {str(e)}",
-            "danger"
-        )
+def prune_export_cache(scope, keep):
 
-    finally:
+    cutoff = time.time() - EXPORT_CACHE_TTL
 
-        if cur:
-            cur.close()
+    for filename in os.listdir(EXPORT_CACHE_DIR):
 
-        if conn:
-            conn.close()
+        path = os.path.join(EXPORT_CACHE_DIR, filename)
 
-    return redirect("/students")
-#------------------------------
-# Edit Student
-#------------------------------
-@app.route("/edit_student/<int:id>", methods=["GET", "POST"])
-def edit_student(id):
+        # Older versions of the same export, and anything past its TTL
+        if filename == keep:
+            continue
 
-    if "admin" not in session:
-        return redirect("/login")
+        if filename.startswith(scope + "-") or os.path.getmtime(path) < cutoff:
 
-    conn = None
-    cur = None
+            try:
+                os.remove(path)
+            except OSError:
+                pass
 
-    try:
 
-        conn = get_db()
-        cur = conn.cursor()
+def serve_export(export_format):
 
-        # -----------------------------
-        # GET Request
-        # -----------------------------
-        if request.method == "GET":
+    criteria, filters = attendance_filters(request.args)
 
-            cur.execute("""
-                SELECT
-                    student_id,
-                    name,
-                    usn,
-                    qr_code
-                FROM students
-                WHERE student_id = :1
-            """, (id,))
+    mimetype, download_name = EXPORT_FORMATS[export_format]
 
-            student = cur.fetchone()
+    try:
 
-            if not student:
-                flash("Student not found.", "danger")
-                return redirect("/students")
+        repo = get_repo()
 
-            return render_template(
-                "edit_student.html",
-                student=student
-            )
+        hwm = repo.attendance_hwm()
+        last_marked = hwm[1]
 
-        # -----------------------------
-        # POST Request
-        # -----------------------------
+        scope, etag = export_cache_key(export_format, filters, hwm)
 
-        new_name = request.form["name"].strip()
-        new_usn = request.form["usn"].strip().upper()
+        filename = f"{etag}.{export_format}"
+        path = os.path.join(EXPORT_CACHE_DIR, filename)
 
-        # Get existing student
-        cur.execute("""
-            SELECT
-                name,
-                usn,
-                qr_code
-            FROM students
-            WHERE student_id = :1
-        """, (id,))
+        headers = {}
 
-        old_student = cur.fetchone()
+        if etag in request.if_none_match:
+            cache = "HIT"
 
-        if not old_student:
+        elif os.path.exists(path):
+            cache = "HIT"
 
-            flash("Student not found.", "danger")
-            return redirect("/students")
+        else:
 
-        old_usn = old_student[1]
-        old_qr = old_student[2]
+            cache = "MISS"
 
-        # Check duplicate USN
-        cur.execute("""
-            SELECT COUNT(*)
-            FROM students
-            WHERE usn = :1
-            AND student_id <> :2
-        """, (new_usn, id))
+            os.makedirs(EXPORT_CACHE_DIR, exist_ok=True)
 
-        duplicate = cur.fetchone()[0]
+            start = time.perf_counter()
 
-        if duplicate > 0:
+            batches = repo.attendance_export(criteria, EXPORT_FETCH_SIZE)
 
-            flash("USN already exists.", "warning")
+            # Build beside the final name and swap in atomically so a
+            # concurrent download never sees a half-written file
+            fd, tmp_path = tempfile.mkstemp(dir=EXPORT_CACHE_DIR, suffix=".tmp")
 
-            return redirect(f"/edit_student/{id}")
+            try:
 
-        # If USN changed, regenerate QR
+                with os.fdopen(fd, "wb") as output:
 
-        if old_usn != new_usn:
+                    if export_format == "pdf":
+                        pages = build_attendance_pdf(output, batches, filters)
+                        headers["X-Report-Pages"] = str(pages)
+                    else:
+                        build_attendance_xlsx(output, batches)
 
-            # Delete old QR
+                os.replace(tmp_path, path)
 
-            if old_qr:
+            except Exception:
 
-                old_path = os.path.join(
-                    app.static_folder,
-                    old_qr
-                )
+                os.remove(tmp_path)
+                raise
 
-                if os.path.exists(old_path):
-                    os.remove(old_path)
+            elapsed = (time.perf_counter() - start) * 1000
 
-            # Create QR folder
+            headers["X-Report-Generation-Ms"] = f"{elapsed:.0f}"
 
-            qr_folder = os.path.join(
-                app.static_folder,
-                "qrcodes"
+            app.logger.info(
+                "%s export built in %.0f ms (%s)",
+                export_format.upper(),
+                elapsed,
+                describe_filters(filters) or "no filters"
             )
 
-            os.makedirs(
-                qr_folder,
-                exist_ok=True
-            )
+            prune_export_cache(scope, filename)
 
-            # Generate new QR
+        if cache == "HIT" and not os.path.exists(path):
 
-            file_path = os.path.join(
-                qr_folder,
-                f"{new_usn}.png"
-            )
+            # The client already holds this exact version
+            response = app.response_class(status=304)
+            response.set_etag(etag)
 
-            qr_data = f"STUDENT:{new_usn}"
+        else:
 
-            qr = qrcode.make(qr_data)
+            response = send_file(
 
-            qr.save(file_path)
+                path,
 
-            qr_db_path = f"qrcodes/{new_usn}.png"
+                as_attachment=True,
 
-        else:
+                download_name=download_name,
 
-            qr_db_path = old_qr
+                mimetype=mimetype,
 
-        # Update student
+                etag=etag,
 
-        cur.execute("""
-            UPDATE students
-            SET
-                name = :1,
-                usn = :2,
-                qr_code = :3
-            WHERE student_id = :4
-        """, (
+                last_modified=last_marked.astimezone() if last_marked else None,
 
-            new_name,
-            new_usn,
-            qr_db_path,
-            id
+                conditional=True
 
-        ))
+            )
 
-        conn.commit()
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
 
-        flash(
-            "Student updated successfully!",
-            "success"
-        )
+        response.headers["X-Export-Cache"] = cache
+        response.headers.update(headers)
 
-        return redirect("/students")
+        return response
 
     except Exception as e:
 
-        if conn:
-            conn.rollback()
-
-        flash(
-            f"Error: {str(e)}",
-            "danger"
-        )
-
-        return redirect("/students")
+        flash(str(e), "danger")
 
-    finally:
+        return redirect("/attendance")
 
-        if cur:
-            cur.close()
 
-        if conn:
-            conn.close()
-# -----------------------------
-# View Attendance
-# -----------------------------
-@app.route("/attendance")
-def view_attendance():
+@app.route("/export/pdf")
+def export_pdf():
 
-    # Check login
     if "admin" not in session:
         return redirect("/login")
 
-    conn = None
-    cur = None
-
-    try:
+    return serve_export("pdf")
 
-        conn = get_db()
-        cur = conn.cursor()
 
-        cur.execute("""
-            SELECT
-                s.name,
-                s.usn,
-                a.date_attended,
-                a.status
-            FROM students s
-            JOIN attendance a
-                ON s.student_id = a.student_id
-            ORDER BY a.date_attended DESC
-        """)
+@app.route("/export/excel")
+def export_excel():
 
-        records = cur.fetchall()
+    if "admin" not in session:
+        return redirect("/login")
 
-        return render_template(
-            "view_attendance.html",
-            records=records
-        )
+    return serve_export("xlsx")
 
-    except Exception as e:
 
-        flash(
-            f"Database Error: {str(e)}",
-            "danger"
-        )
+# -----------------------------
+# Attendance Percentage Report
+# -----------------------------
+# Every student's present count comes from one GROUP BY over the
+# monthly rollup, with the session-day total in the same statement
+# (Repository.percentage_report_rows).
+# The computed report is kept in memory keyed by the same
+# attendance high-water mark as the export cache, so it is reused
+# until the next mark (from any worker) or roster change.
+REPORT_THRESHOLD = float(os.getenv("REPORT_THRESHOLD", "75"))
+REPORT_PAGE_SIZE = 50
+REPORT_MAX_PAGE_SIZE = 500
+
+# Sort keys: ?sort= value -> row index; percentage ascending puts
+# the students who need attention first
+REPORT_SORTS = {
+    "percentage": 5,
+    "present": 3,
+    "name": 1,
+    "usn": 2
+}
+
+_percentage_report = {
+    "hwm": None,
+    "rows": None,
+    "sessions": 0
+}
+_percentage_report_lock = threading.Lock()
+
+_percentage_report_stats = {
+    "hits": 0,
+    "misses": 0
+}
+
+
+def get_percentage_report(repo):
+
+    # Returns (rows, sessions); rows are
+    # (student_id, name, usn, present, absent, percentage)
+    hwm = repo.attendance_hwm()
+
+    with _percentage_report_lock:
+
+        if _percentage_report["rows"] is not None and _percentage_report["hwm"] == hwm:
+            _percentage_report_stats["hits"] += 1
+            return _percentage_report["rows"], _percentage_report["sessions"]
+
+        _percentage_report_stats["misses"] += 1
+
+    rows = []
+    sessions = 0
+
+    for student_id, name, usn, present, sessions in repo.percentage_report_rows():
+
+        percentage = round(present / sessions * 100, 2) if sessions else 0.0
+
+        rows.append((
+            student_id,
+            name,
+            usn,
+            present,
+            max(sessions - present, 0),
+            percentage
+        ))
 
-        return redirect("/")
+    with _percentage_report_lock:
 
-    finally:
+        _percentage_report["hwm"] = hwm
+        _percentage_report["rows"] = rows
+        _percentage_report["sessions"] = sessions
 
-        if cur:
-            cur.close()
+    return rows, sessions
 
-        if conn:
-            conn.close()
 
-@app.route("/export/pdf")
-def export_pdf():
+def percentage_report_view(args):
 
-    if "admin" not in session:
-        return redirect("/login")
+    # Applies ?sort=, ?order=, ?threshold= and ?below=1 to the cached report
+    sort = args.get("sort", "percentage")
 
-    conn = None
-    cur = None
+    if sort not in REPORT_SORTS:
+        sort = "percentage"
 
-    try:
+    descending = args.get("order") == "desc"
 
-        conn = get_db()
-        cur = conn.cursor()
+    threshold = args.get("threshold", REPORT_THRESHOLD, type=float)
+    threshold = max(0.0, min(threshold, 100.0))
 
-        cur.execute("""
-            SELECT
-                s.name,
-                s.usn,
-                a.date_attended,
-                a.status
-            FROM students s
-            JOIN attendance a
-                ON s.student_id = a.student_id
-            ORDER BY a.date_attended DESC
-        """)
+    below = args.get("below") == "1"
 
-        records = cur.fetchall()
+    return {
+        "sort": sort,
+        "order": "desc" if descending else "asc",
+        "threshold": threshold,
+        "below": below
+    }
 
-        buffer = BytesIO()
 
-        doc = SimpleDocTemplate(buffer)
+def select_report_rows(rows, view):
 
-        styles = getSampleStyleSheet()
+    key = REPORT_SORTS[view["sort"]]
 
-        elements = []
+    if view["below"]:
+        rows = [row for row in rows if row[5] < view["threshold"]]
 
-        # Title
-        elements.append(
-            Paragraph(
-                "<b>Student Attendance Report</b>",
-                styles["Title"]
-            )
-        )
+    return sorted(
+        rows,
+        key=lambda row: (row[key], row[1]),
+        reverse=view["order"] == "desc"
+    )
 
-        elements.append(
-            Paragraph(
-                "Generated by Student Attendance Management System",
-                styles["Normal"]
-            )
-        )
 
-        elements.append(Spacer(1, 0.3 * inch))
+@app.route("/reports/percentages")
+def percentage_report():
 
-        # Table Data
+    if "admin" not in session:
+        return redirect("/login")
 
-        data = [
+    view = percentage_report_view(request.args)
 
-            ["Name", "USN", "Date", "Status"]
+    limit = request.args.get("limit", REPORT_PAGE_SIZE, type=int)
+    limit = max(1, min(limit, REPORT_MAX_PAGE_SIZE))
 
-        ]
+    page = max(request.args.get("page", 1, type=int), 1)
 
-        for row in records:
+    try:
 
-            data.append([
+        rows, sessions = get_percentage_report(get_repo())
 
-                row[0],
+        selected = select_report_rows(rows, view)
 
-                row[1],
+        flagged = sum(1 for row in rows if row[5] < view["threshold"])
 
-                row[2].strftime("%d-%m-%Y %H:%M"),
+        pages = max((len(selected) + limit - 1) // limit, 1)
+        page = min(page, pages)
 
-                row[3]
+        query = {
+            "sort": view["sort"],
+            "order": view["order"],
+            "threshold": view["threshold"]
+        }
 
-            ])
+        if view["below"]:
+            query["below"] = "1"
 
-        table = Table(data)
+        if limit != REPORT_PAGE_SIZE:
+            query["limit"] = limit
 
-        table.setStyle(
+        return render_template(
+            "report_percentages.html",
+            rows=selected[(page - 1) * limit:page * limit],
+            offset=(page - 1) * limit,
+            matched=len(selected),
+            total_students=len(rows),
+            flagged=flagged,
+            sessions=sessions,
+            view=view,
+            export_args=query,
+            prev_url=url_for("percentage_report", page=page - 1, **query) if page > 1 else None,
+            next_url=url_for("percentage_report", page=page + 1, **query) if page < pages else None,
+            page=page,
+            pages=pages
+        )
 
-            TableStyle([
+    except Exception as e:
 
-                ("BACKGROUND", (0, 0), (-1, 0), colors.darkblue),
+        flash(f"Database Error: {str(e)}", "danger")
 
-                ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
+        return redirect("/")
 
-                ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
 
-                ("GRID", (0, 0), (-1, -1), 1, colors.grey),
+@app.route("/reports/percentages/export")
+def export_percentage_report():
 
-                ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+    if "admin" not in session:
+        return redirect("/login")
 
-                ("BACKGROUND", (0, 1), (-1, -1), colors.beige),
+    view = percentage_report_view(request.args)
 
-                ("BOTTOMPADDING", (0, 0), (-1, 0), 8)
+    try:
 
-            ])
+        rows, sessions = get_percentage_report(get_repo())
 
-        )
+        selected = select_report_rows(rows, view)
 
-        elements.append(table)
+        output = BytesIO()
 
-        doc.build(elements)
+        build_attendance_xlsx(
+            output,
+            iter([[
+                (name, usn, present, absent, sessions, percentage,
+                 "Below" if percentage < view["threshold"] else "")
+                for _, name, usn, present, absent, percentage in selected
+            ]]),
+            header=[
+                "Student Name",
+                "USN",
+                "Present",
+                "Absent",
+                "Sessions",
+                "Attendance %",
+                f"Below {view['threshold']:g}%"
+            ],
+            title="Percentages"
+        )
 
-        buffer.seek(0)
+        output.seek(0)
 
         return send_file(
 
-            buffer,
+            output,
 
             as_attachment=True,
 
-            download_name="Attendance_Report.pdf",
+            download_name="Attendance_Percentages.xlsx",
 
-            mimetype="application/pdf"
+            mimetype=EXPORT_FORMATS["xlsx"][0]
 
         )
 
     except Exception as e:
 
-        flash(str(e), "danger")
+        flash(f"Error: {str(e)}", "danger")
 
-        return redirect("/attendance")
+        return redirect("/reports/percentages")
 
-    finally:
 
-        if cur:
-            cur.close()
+# -----------------------------
+# Student Profile
+# -----------------------------
+# The student row and every day the student was present come back
+# in one round trip (Repository.student_profile_rows) through the
+# (student_id, attendance_day) index; the global session-day set
+# comes from the Session Days cache. Counts, the monthly breakdown,
+# streaks and the calendar are all derived from those two sets.
+PROFILE_CALENDAR_WEEKS = 26
+PROFILE_MONTHS = 12
 
-        if conn:
-            conn.close()
 
-@app.route("/export/excel")
-def export_excel():
+def attendance_streaks(sessions, present):
 
-    if "admin" not in session:
-        return redirect("/login")
+    # sessions is sorted ascending. Today's session does not break
+    # the current streak until the day is over.
+    today = date.today()
 
-    conn = None
-    cur = None
+    best = 0
+    run = 0
 
-    try:
+    for day in sessions:
 
-        conn = get_db()
-        cur = conn.cursor()
-
-        cur.execute("""
-            SELECT
-                s.name,
-                s.usn,
-                a.date_attended,
-                a.status
-            FROM students s
-            JOIN attendance a
-            ON s.student_id = a.student_id
-            ORDER BY a.date_attended DESC
-        """)
-
-        records = cur.fetchall()
-
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Attendance"
-
-        # Header
-        ws.append([
-            "Student Name",
-            "USN",
-            "Date",
-            "Status"
-        ])
-
-        # Bold header
-        from openpyxl.styles import Font
-
-        for cell in ws[1]:
-            cell.font = Font(bold=True)
-
-        # Data
-        for row in records:
-            ws.append(row)
+        if day in present:
+            run += 1
+            best = max(best, run)
 
-        # Auto width
-        for column in ws.columns:
+        else:
+            run = 0
 
-            max_length = 0
+    current = 0
 
-            column_letter = column[0].column_letter
+    for day in reversed(sessions):
 
-            for cell in column:
+        if day in present:
+            current += 1
 
-                try:
+        elif day != today:
+            break
 
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
+    return current, best
 
-                except:
-                    pass
 
-            ws.column_dimensions[column_letter].width = max_length + 3
+def monthly_breakdown(sessions, present):
 
-        output = BytesIO()
+    months = {}
 
-        wb.save(output)
+    for day in sessions:
 
-        output.seek(0)
+        month = months.setdefault(day.replace(day=1), [0, 0])
+        month[1] += 1
 
-        return send_file(
+        if day in present:
+            month[0] += 1
 
-            output,
+    return [
+        {
+            "month": month.strftime("%b %Y"),
+            "present": attended,
+            "sessions": held,
+            "percentage": round(attended / held * 100, 2)
+        }
+        for month, (attended, held) in sorted(months.items(), reverse=True)[:PROFILE_MONTHS]
+    ]
 
-            download_name="Attendance_Report.xlsx",
 
-            as_attachment=True,
+def attendance_calendar(sessions, present):
 
-            mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    # PROFILE_CALENDAR_WEEKS columns of Monday..Sunday cells
+    today = date.today()
+    start = today.toordinal() - today.weekday() - 7 * (PROFILE_CALENDAR_WEEKS - 1)
 
-        )
+    weeks = []
 
-    finally:
+    for week in range(PROFILE_CALENDAR_WEEKS):
+
+        cells = []
+
+        for weekday in range(7):
+
+            day = date.fromordinal(start + week * 7 + weekday)
+
+            if day > today:
+                state = "future"
+            elif day in present:
+                state = "present"
+            elif day in sessions:
+                state = "absent"
+            else:
+                state = "none"
+
+            cells.append({"date": day.isoformat(), "state": state})
+
+        weeks.append(cells)
+
+    return weeks
 
-        if cur:
-            cur.close()
 
-        if conn:
-            conn.close()
-            
 @app.route("/student/<int:student_id>")
 def student_profile(student_id):
 
     if "admin" not in session:
         return redirect("/login")
 
-    conn = None
-    cur = None
+    student = None
+    present_days = set()
 
-    try:
+    repo = get_repo()
 
-        conn = get_db()
-        cur = conn.cursor()
+    for kind, name, usn, day in repo.student_profile_rows(student_id):
 
-        # Student details
-        cur.execute("""
-            SELECT
-                student_id,
-                name,
-                usn,
-                qr_code
-            FROM students
-            WHERE student_id = :1
-        """, (student_id,))
+        if kind == "student":
+            student = (student_id, name, usn)
+        else:
+            present_days.add(day.date())
 
-        student = cur.fetchone()
+    if not student:
+        flash("Student not found!", "danger")
+        return redirect("/students")
 
-        if not student:
-            flash("Student not found!", "danger")
-            return redirect("/students")
+    sessions = get_session_days(repo) | present_days
+    ordered = sorted(sessions)
 
-        # Present count
-        cur.execute("""
-            SELECT COUNT(*)
-            FROM attendance
-            WHERE student_id = :1
-            AND status = 'Present'
-        """, (student_id,))
+    present = len(present_days)
+    total_classes = len(sessions)
 
-        present = cur.fetchone()[0]
+    absent = max(total_classes - present, 0)
 
-        # Total attendance sessions
-        cur.execute("""
-            SELECT COUNT(DISTINCT TRUNC(date_attended))
-            FROM attendance
-        """)
+    percentage = 0
 
-        total_classes = cur.fetchone()[0]
+    if total_classes > 0:
+        percentage = round(
+            (present / total_classes) * 100,
+            2
+        )
 
-        absent = max(total_classes - present, 0)
+    current_streak, best_streak = attendance_streaks(ordered, present_days)
 
-        percentage = 0
+    return render_template(
 
-        if total_classes > 0:
-            percentage = round(
-                (present / total_classes) * 100,
-                2
-            )
+        "student_profile.html",
 
-        return render_template(
+        student=student,
 
-            "student_profile.html",
+        present=present,
 
-            student=student,
+        absent=absent,
 
-            present=present,
+        total=total_classes,
 
-            absent=absent,
+        percentage=percentage,
 
-            total=total_classes,
+        current_streak=current_streak,
 
-            percentage=percentage
+        best_streak=best_streak,
 
-        )
+        months=monthly_breakdown(ordered, present_days),
 
-    finally:
+        calendar=attendance_calendar(sessions, present_days)
+
+    )
 
-        if cur:
-            cur.close()
 
-        if conn:
-            conn.close()
 # -----------------------------
 # Run Application
 # -----------------------------
 if __name__ == "__main__":
+    warm_caches()
     app.run(debug=True)
\ No newline at end of file
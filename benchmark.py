@@ -0,0 +1,636 @@
+"""Load test and micro-benchmarks for the attendance app.
+
+Seeds a synthetic roster and N years of attendance into a throwaway
+SQLite database (DB_BACKEND=sqlite), then:
+
+  * drives /api/mark_attendance at a fixed concurrency and reports
+    p50/p95/p99 latency, throughput and the status mix
+  * times the dashboard, attendance list, student profile and the
+    PDF/Excel exports; the dashboard and exports are timed both with
+    their caches cleared before each call and served from cache
+  * records peak RSS and the per-statement timings from QueryStats
+
+Each roster size runs in its own process so caches and RSS don't
+leak between sizes. Results go to a JSON file; pass --baseline with
+an earlier results file to flag p95 regressions (uncached timings
+for every route, plus cached timings for cached routes).
+
+    python benchmark.py --students 200 2000 --years 2 --output bench.json
+    python benchmark.py --baseline bench.json --output bench-new.json
+
+Requests go through Flask's test client, so the numbers cover the
+app and the database but not a WSGI server or the network.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+
+# -----------------------------
+# Defaults
+# -----------------------------
+DEFAULT_STUDENTS = [200]
+DEFAULT_YEARS = 1
+DEFAULT_PRESENT_RATE = 0.85
+DEFAULT_CONCURRENCY = 8
+DEFAULT_MARKS = 1000
+DEFAULT_REPEAT = 5
+DEFAULT_TOLERANCE = 0.25
+
+SEED_BATCH = 5000
+
+DEFAULT_COLD_REPEAT = 3
+
+# (name, path, cached): cached routes are also timed with their
+# cache cleared before every call (see reset_route_cache)
+ROUTES = [
+    ("index", "/", True),
+    ("view_attendance", "/attendance", False),
+    ("student_profile", "/student/{student_id}", False),
+    ("export_pdf", "/export/pdf", True),
+    ("export_excel", "/export/excel", True)
+]
+
+
+# -----------------------------
+# Statistics
+# -----------------------------
+def percentile(samples, pct):
+
+    # Nearest-rank on sorted samples
+    if not samples:
+        return None
+
+    ordered = sorted(samples)
+
+    rank = max(int(round(pct / 100 * len(ordered) + 0.5)) - 1, 0)
+
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def summarize(samples):
+
+    if not samples:
+        return {"count": 0}
+
+    return {
+        "count": len(samples),
+        "min_ms": round(min(samples), 3),
+        "mean_ms": round(sum(samples) / len(samples), 3),
+        "p50_ms": round(percentile(samples, 50), 3),
+        "p95_ms": round(percentile(samples, 95), 3),
+        "p99_ms": round(percentile(samples, 99), 3),
+        "max_ms": round(max(samples), 3)
+    }
+
+
+def peak_rss_kb():
+
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    if sys.platform == "darwin":
+        peak //= 1024
+
+    return peak
+
+
+# -----------------------------
+# Seeding
+# -----------------------------
+def session_days(years, today):
+
+    # Weekdays only, ending yesterday so today's scans are fresh marks
+    start = today - timedelta(days=365 * years)
+    day = start
+
+    while day < today:
+
+        if day.weekday() < 5:
+            yield day
+
+        day += timedelta(days=1)
+
+
+def seed(backend, students, years, present_rate, rng):
+
+    today = date.today()
+
+    with backend.session() as repo:
+
+        repo.insert_students([
+            (
+                f"Student {i:05d}",
+                f"1BM{2000 + i // 10000:04d}CS{i % 10000:04d}",
+                None
+            )
+            for i in range(students)
+        ])
+
+        repo.commit()
+
+        student_ids = [row[1] for row in repo.student_index_rows()]
+
+        rows = 0
+        batch = []
+
+        for day in session_days(years, today):
+
+            for student_id in student_ids:
+
+                if rng.random() >= present_rate:
+                    continue
+
+                batch.append((
+                    student_id,
+                    datetime.combine(day, datetime.min.time()).replace(
+                        hour=9,
+                        minute=rng.randrange(60),
+                        second=rng.randrange(60)
+                    )
+                ))
+
+                if len(batch) >= SEED_BATCH:
+                    rows += insert_attendance(repo, batch)
+                    batch = []
+
+        if batch:
+            rows += insert_attendance(repo, batch)
+
+        repo.commit()
+
+        repo.rebuild_rollups()
+
+    return student_ids, rows
+
+
+def insert_attendance(repo, batch):
+
+    repo.conn.executemany(
+        "INSERT INTO attendance (student_id, date_attended, status) "
+        "VALUES (?, ?, 'Present')",
+        batch
+    )
+
+    return len(batch)
+
+
+# -----------------------------
+# Workloads
+# -----------------------------
+def logged_in_client(app_module):
+
+    client = app_module.app.test_client()
+
+    with client.session_transaction() as sess:
+        sess["admin"] = "benchmark"
+
+    return client
+
+
+def run_marks(app_module, usns, marks, concurrency):
+
+    # Each worker thread gets its own client; a test client keeps a
+    # cookie jar and is not safe to share across threads
+    local = threading.local()
+    statuses = {}
+    errors = 0
+    lock = threading.Lock()
+
+    def mark(usn):
+
+        nonlocal errors
+
+        client = getattr(local, "client", None)
+
+        if client is None:
+            client = local.client = logged_in_client(app_module)
+
+        start = time.perf_counter()
+        response = client.get(f"/api/mark_attendance/STUDENT:{usn}")
+        elapsed = (time.perf_counter() - start) * 1000
+
+        body = response.get_json(silent=True) or {}
+        message = body.get("message", "")
+
+        if response.status_code != 200:
+            outcome = f"http_{response.status_code}"
+        elif body.get("success"):
+            outcome = "marked"
+        elif "already" in message:
+            outcome = "duplicate"
+        else:
+            outcome = "failed"
+
+        with lock:
+
+            statuses[outcome] = statuses.get(outcome, 0) + 1
+
+            if outcome.startswith("http_") or outcome == "failed":
+                errors += 1
+
+        return elapsed
+
+    # Walks the roster in order, so runs longer than the roster
+    # exercise the duplicate path too
+    targets = [usns[i % len(usns)] for i in range(marks)]
+
+    start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(mark, targets))
+
+    wall = time.perf_counter() - start
+
+    return {
+        "concurrency": concurrency,
+        "requests": marks,
+        "wall_s": round(wall, 3),
+        "throughput_rps": round(marks / wall, 1) if wall else None,
+        "errors": errors,
+        "statuses": statuses,
+        "latency": summarize(latencies)
+    }
+
+
+def reset_route_cache(app_module, name):
+
+    # The dashboard sits behind a TTL cache and exports behind the
+    # on-disk export cache; clearing them makes the next call do the
+    # full query and render
+    if name == "index":
+        app_module.invalidate_dashboard()
+
+    elif name.startswith("export_"):
+        shutil.rmtree(app_module.EXPORT_CACHE_DIR, ignore_errors=True)
+
+
+def timed_get(client, path, cache):
+
+    start = time.perf_counter()
+    response = client.get(path)
+    data = response.get_data()
+    elapsed = (time.perf_counter() - start) * 1000
+
+    if response.status_code != 200:
+        raise RuntimeError(f"{path} returned {response.status_code}")
+
+    hit = response.headers.get("X-Export-Cache")
+
+    if hit:
+        cache[hit] = cache.get(hit, 0) + 1
+
+    return elapsed, len(data)
+
+
+def time_routes(app_module, student_id, repeat, cold_repeat):
+
+    client = logged_in_client(app_module)
+
+    results = {}
+
+    for name, path, cached in ROUTES:
+
+        path = path.format(student_id=student_id)
+
+        cache = {}
+        sizes = []
+
+        # Uncached: what a regression in the query or render costs.
+        # Routes without a cache are uncached on every call.
+        cold = []
+
+        for _ in range(cold_repeat if cached else 1):
+
+            reset_route_cache(app_module, name)
+
+            elapsed, size = timed_get(client, path, cache)
+            cold.append(elapsed)
+            sizes.append(size)
+
+        warm = []
+
+        for _ in range(repeat - 1):
+
+            elapsed, size = timed_get(client, path, cache)
+            warm.append(elapsed)
+            sizes.append(size)
+
+        if not cached:
+            cold += warm
+
+        results[name] = {
+            "path": path,
+            "cached": cached,
+            "first_ms": round(cold[0], 3),
+            "cold": summarize(cold),
+            "warm": summarize(warm),
+            "bytes": max(sizes)
+        }
+
+        if cache:
+            results[name]["export_cache"] = cache
+
+    return results
+
+
+# -----------------------------
+# One roster size (child process)
+# -----------------------------
+def run_scale(args):
+
+    with tempfile.TemporaryDirectory(prefix="attendance-bench-") as workdir:
+        return run_scale_in(args, workdir)
+
+
+def run_scale_in(args, workdir):
+
+    # Point every on-disk store at the scratch directory before the
+    # app module reads its configuration
+    os.environ.update({
+        "DB_BACKEND": "sqlite",
+        "SQLITE_PATH": os.path.join(workdir, "attendance.db"),
+        "EXPORT_CACHE_DIR": os.path.join(workdir, "export_cache"),
+        "EXPORT_RESULTS_DIR": os.path.join(workdir, "exports"),
+        "QR_STATIC_FILES": "0",
+        "SECRET_KEY": os.getenv("SECRET_KEY", "benchmark")
+    })
+
+    from repository import QueryStats, create_backend
+
+    rng = random.Random(args.seed)
+
+    start = time.perf_counter()
+
+    student_ids, attendance_rows = seed(
+        create_backend("sqlite", QueryStats()),
+        args.students,
+        args.years,
+        args.present_rate,
+        rng
+    )
+
+    seed_s = time.perf_counter() - start
+
+    import app as app_module
+
+    with app_module.app.app_context():
+        usns = [row[0] for row in app_module.get_repo().student_index_rows()]
+
+    routes = time_routes(app_module, rng.choice(student_ids), args.repeat, args.cold_repeat)
+
+    marks = run_marks(app_module, usns, args.marks, args.concurrency)
+
+    return {
+        "students": args.students,
+        "years": args.years,
+        "attendance_rows": attendance_rows,
+        "seed_s": round(seed_s, 3),
+        "marks": marks,
+        "routes": routes,
+        "peak_rss_kb": peak_rss_kb(),
+        "queries": app_module.query_stats.snapshot()
+    }
+
+
+# -----------------------------
+# Driver
+# -----------------------------
+def git_revision():
+
+    try:
+
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            check=True
+        ).stdout.strip()
+
+    except (OSError, subprocess.CalledProcessError):
+
+        return None
+
+
+def scale_command(args, students, output):
+
+    return [
+        sys.executable,
+        os.path.abspath(__file__),
+        "--scale-worker",
+        "--students", str(students),
+        "--years", str(args.years),
+        "--present-rate", str(args.present_rate),
+        "--concurrency", str(args.concurrency),
+        "--marks", str(args.marks),
+        "--repeat", str(args.repeat),
+        "--cold-repeat", str(args.cold_repeat),
+        "--seed", str(args.seed),
+        "--output", output
+    ]
+
+
+def compare(results, baseline, tolerance):
+
+    # p95 regressions beyond the tolerance, matched on roster size
+    previous = {scale["students"]: scale for scale in baseline.get("scales", [])}
+
+    regressions = []
+
+    for scale in results["scales"]:
+
+        before = previous.get(scale["students"])
+
+        if not before:
+            continue
+
+        pairs = [("marks", before["marks"]["latency"], scale["marks"]["latency"])]
+
+        # Uncached timings catch query and render regressions; warm
+        # timings of cached routes catch regressions in the cache path
+        for name, route in scale["routes"].items():
+
+            old_route = before["routes"].get(name)
+
+            if not old_route or "cold" not in old_route:
+                continue
+
+            pairs.append((name, old_route["cold"], route["cold"]))
+
+            if route["cached"]:
+                pairs.append((f"{name} (cached)", old_route["warm"], route["warm"]))
+
+        for name, old, new in pairs:
+
+            if not old.get("p95_ms") or not new.get("p95_ms"):
+                continue
+
+            ratio = new["p95_ms"] / old["p95_ms"]
+
+            if ratio > 1 + tolerance:
+                regressions.append({
+                    "students": scale["students"],
+                    "benchmark": name,
+                    "baseline_p95_ms": old["p95_ms"],
+                    "p95_ms": new["p95_ms"],
+                    "ratio": round(ratio, 2)
+                })
+
+    return regressions
+
+
+def print_summary(results):
+
+    for scale in results["scales"]:
+
+        marks = scale["marks"]
+
+        print(
+            f"\n{scale['students']} students, {scale['attendance_rows']} attendance rows "
+            f"(seeded in {scale['seed_s']}s), peak RSS {scale['peak_rss_kb'] // 1024} MiB"
+        )
+
+        print(
+            f"  mark_attendance  c={marks['concurrency']}  {marks['throughput_rps']} req/s  "
+            f"p50 {marks['latency']['p50_ms']}  p95 {marks['latency']['p95_ms']}  "
+            f"p99 {marks['latency']['p99_ms']} ms  {marks['statuses']}"
+        )
+
+        for name, route in scale["routes"].items():
+
+            cold = route["cold"]
+            warm = route["warm"]
+
+            line = (
+                f"  {name:<16} uncached p50 {cold.get('p50_ms')}  p95 {cold.get('p95_ms')} ms"
+            )
+
+            if route["cached"]:
+                line += f"  cached p50 {warm.get('p50_ms')}  p95 {warm.get('p95_ms')} ms"
+
+            print(f"{line}  {route['bytes']} bytes")
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Benchmark the attendance app on seeded data.")
+
+    parser.add_argument("--students", type=int, nargs="+", default=DEFAULT_STUDENTS,
+                        help="roster sizes to run (one process each)")
+    parser.add_argument("--years", type=int, default=DEFAULT_YEARS,
+                        help="years of weekday attendance to seed")
+    parser.add_argument("--present-rate", type=float, default=DEFAULT_PRESENT_RATE)
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help="threads driving /api/mark_attendance")
+    parser.add_argument("--marks", type=int, default=DEFAULT_MARKS,
+                        help="scan requests to send")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT,
+                        help="calls per timed route")
+    parser.add_argument("--cold-repeat", type=int, default=DEFAULT_COLD_REPEAT,
+                        help="calls per cached route with its cache cleared")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--baseline", help="earlier results file to compare p95 against")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed p95 slowdown against the baseline (0.25 = 25%%)")
+    parser.add_argument("--scale-worker", action="store_true", help=argparse.SUPPRESS)
+
+    args = parser.parse_args()
+
+    if args.scale_worker:
+        args.students = args.students[0]
+
+        result = run_scale(args)
+
+        with open(args.output, "w") as f:
+            json.dump(result, f)
+
+        return 0
+
+    results = {
+        "revision": git_revision(),
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "config": {
+            "years": args.years,
+            "present_rate": args.present_rate,
+            "concurrency": args.concurrency,
+            "marks": args.marks,
+            "repeat": args.repeat,
+            "cold_repeat": args.cold_repeat,
+            "seed": args.seed
+        },
+        "scales": []
+    }
+
+    for students in args.students:
+
+        print(f"Running {students} students...", file=sys.stderr)
+
+        # The worker writes its results to a file; stdout and stderr
+        # are left to the app's own logging
+        with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+            scale_output = f.name
+
+        try:
+
+            completed = subprocess.run(scale_command(args, students, scale_output))
+
+            if completed.returncode != 0:
+                return completed.returncode
+
+            with open(scale_output) as f:
+                results["scales"].append(json.load(f))
+
+        finally:
+
+            os.remove(scale_output)
+
+    exit_code = 0
+
+    if args.baseline:
+
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+        results["baseline"] = baseline.get("revision")
+        results["regressions"] = compare(results, baseline, args.tolerance)
+
+        if results["regressions"]:
+            exit_code = 1
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    print_summary(results)
+
+    for regression in results.get("regressions", []):
+
+        print(
+            f"REGRESSION {regression['benchmark']} @ {regression['students']} students: "
+            f"p95 {regression['baseline_p95_ms']} -> {regression['p95_ms']} ms "
+            f"(x{regression['ratio']})"
+        )
+
+    print(f"\nResults written to {args.output}")
+
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,23 @@
+-- -----------------------------
+-- 001: One attendance row per student per day
+-- -----------------------------
+-- Adds a virtual ATTENDANCE_DAY column (TRUNC of date_attended) and a
+-- unique index on (student_id, attendance_day). The marking block in
+-- app.py relies on this index raising DUP_VAL_ON_INDEX instead of
+-- running a separate duplicate check, so concurrent scans of the same
+-- QR code can never both insert.
+
+-- Remove duplicates left behind by the old check-then-insert path
+DELETE FROM attendance a
+WHERE a.ROWID NOT IN (
+    SELECT MIN(ROWID)
+    FROM attendance
+    GROUP BY student_id, TRUNC(date_attended)
+);
+
+ALTER TABLE attendance ADD (
+    attendance_day DATE GENERATED ALWAYS AS (TRUNC(date_attended)) VIRTUAL
+);
+
+CREATE UNIQUE INDEX attendance_student_day_uk
+    ON attendance (student_id, attendance_day);
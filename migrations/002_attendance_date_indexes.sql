@@ -0,0 +1,18 @@
+-- -----------------------------
+-- 002: Indexes for date-range attendance queries
+-- -----------------------------
+-- The dashboard, the today bitmap and the student profile filter
+-- attendance with range predicates on date_attended
+-- (date_attended >= :day AND date_attended < :day + 1), which can
+-- use a plain index. The (student_id, date_attended) index serves
+-- per-student lookups; attendance_day alone serves the distinct
+-- session-day count without reading the table.
+
+CREATE INDEX attendance_date_idx
+    ON attendance (date_attended);
+
+CREATE INDEX attendance_student_date_idx
+    ON attendance (student_id, date_attended);
+
+CREATE INDEX attendance_day_idx
+    ON attendance (attendance_day);
@@ -0,0 +1,31 @@
+-- -----------------------------
+-- 003: Daily and per-student monthly attendance rollups
+-- -----------------------------
+-- Maintained incrementally by the marking block in app.py so the
+-- dashboard chart, total record count and student profile read a
+-- few hundred summary rows instead of the attendance table.
+-- 'flask rebuild-rollups' recomputes both tables from attendance.
+
+CREATE TABLE attendance_daily_summary (
+    day           DATE PRIMARY KEY,
+    student_count NUMBER DEFAULT 0 NOT NULL
+);
+
+CREATE TABLE attendance_monthly_student (
+    student_id    NUMBER NOT NULL,
+    month         DATE NOT NULL,
+    present_count NUMBER DEFAULT 0 NOT NULL,
+    CONSTRAINT attendance_monthly_student_pk
+        PRIMARY KEY (student_id, month)
+);
+
+INSERT INTO attendance_daily_summary (day, student_count)
+SELECT attendance_day, COUNT(*)
+FROM attendance
+GROUP BY attendance_day;
+
+INSERT INTO attendance_monthly_student (student_id, month, present_count)
+SELECT student_id, TRUNC(date_attended, 'MM'), COUNT(*)
+FROM attendance
+WHERE status = 'Present'
+GROUP BY student_id, TRUNC(date_attended, 'MM');
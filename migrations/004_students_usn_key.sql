@@ -0,0 +1,17 @@
+-- -----------------------------
+-- 004: Normalized USN column for prefix search
+-- -----------------------------
+-- Student search matches USNs by prefix on usn_key (upper-cased,
+-- spaces and hyphens removed) with usn_key LIKE :prefix || '%',
+-- which is an index range scan instead of the full scan that
+-- UPPER(usn) LIKE '%term%' forced. Name matching is served by the
+-- in-process inverted index, so names need no index here.
+
+ALTER TABLE students ADD (
+    usn_key VARCHAR2(50) GENERATED ALWAYS AS (
+        UPPER(REPLACE(REPLACE(usn, ' '), '-'))
+    ) VIRTUAL
+);
+
+CREATE INDEX students_usn_key_idx
+    ON students (usn_key);
@@ -0,0 +1,10 @@
+-- -----------------------------
+-- 005: Index for the paged students list
+-- -----------------------------
+-- /students pages the roster by keyset on (name, student_id)
+-- (name > :cursor_name OR (name = :cursor_name AND student_id >
+-- :cursor_id)) ORDER BY name, student_id FETCH FIRST n ROWS, which
+-- reads n index entries instead of sorting the whole table.
+
+CREATE INDEX students_name_idx
+    ON students (name, student_id);
@@ -0,0 +1,1730 @@
+import bisect
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+import oracledb
+
+
+# -----------------------------
+# Data Access
+# -----------------------------
+# Every statement the app runs lives here under a name. A Backend
+# hands out connections; a Repository wraps one connection and
+# exposes the queries. DB_BACKEND picks the implementation:
+#
+#   oracle  python-oracledb session pool (the production schema,
+#           built by migrations/*.sql)
+#   sqlite  embedded database at SQLITE_PATH with the same tables
+#           and indexes, for profiling and load tests without an
+#           Oracle instance
+#
+# Statement text is fixed per name, so Oracle's statement cache
+# (DB_STMT_CACHE_SIZE) and sqlite3's per-connection prepared
+# statement cache are both hit on reuse. Each call is timed under
+# its statement name in QueryStats.
+MARK_MARKED = "MARKED"
+MARK_DUPLICATE = "DUPLICATE"
+MARK_NOT_FOUND = "NOT_FOUND"
+
+DB_STMT_CACHE_SIZE = int(os.getenv("DB_STMT_CACHE_SIZE", "50"))
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+
+# Histogram bucket upper bounds, in milliseconds
+LATENCY_BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# Time this thread has spent inside streamed execute/fetch calls, so
+# a caller consuming a stream can take it out of its own timing
+_stream_clock = threading.local()
+
+
+def stream_fetch_ms():
+
+    return getattr(_stream_clock, "ms", 0.0)
+
+
+# -----------------------------
+# Query Timing
+# -----------------------------
+class QueryStats:
+    """Call count, rows, total/max time and a latency histogram per name.
+
+    With slow_ms set, any call at or over it is logged with its binds
+    redacted (see redact_binds).
+    """
+
+    def __init__(self, slow_ms=None, logger=None, buckets=LATENCY_BUCKETS_MS):
+
+        self.slow_ms = slow_ms
+        self.logger = logger or logging.getLogger(__name__)
+        self.buckets = tuple(buckets)
+
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, name, elapsed_ms, rows=0, binds=None):
+
+        with self._lock:
+
+            stat = self._stats.get(name)
+
+            if stat is None:
+                stat = self._stats[name] = {
+                    "calls": 0,
+                    "rows": 0,
+                    "ms_total": 0.0,
+                    "ms_max": 0.0,
+                    "buckets": [0] * (len(self.buckets) + 1)
+                }
+
+            stat["calls"] += 1
+            stat["rows"] += rows
+            stat["ms_total"] += elapsed_ms
+            stat["buckets"][bisect.bisect_left(self.buckets, elapsed_ms)] += 1
+
+            if elapsed_ms > stat["ms_max"]:
+                stat["ms_max"] = elapsed_ms
+
+        if self.slow_ms and elapsed_ms >= self.slow_ms:
+
+            self.logger.warning(
+                "Slow statement %s: %.1f ms, %d row(s), binds %s",
+                name,
+                elapsed_ms,
+                rows,
+                redact_binds(binds)
+            )
+
+    def snapshot(self):
+
+        with self._lock:
+
+            return {
+                name: {
+                    "calls": stat["calls"],
+                    "rows": stat["rows"],
+                    "ms_total": round(stat["ms_total"], 3),
+                    "ms_avg": round(stat["ms_total"] / stat["calls"], 3),
+                    "ms_max": round(stat["ms_max"], 3)
+                }
+                for name, stat in sorted(self._stats.items())
+            }
+
+    def histograms(self):
+
+        # Cumulative bucket counts keyed by upper bound (None = +Inf)
+        with self._lock:
+
+            result = {}
+
+            for name, stat in sorted(self._stats.items()):
+
+                cumulative = 0
+                buckets = []
+
+                for bound, count in zip(self.buckets + (None,), stat["buckets"]):
+                    cumulative += count
+                    buckets.append((bound, cumulative))
+
+                result[name] = {
+                    "buckets": buckets,
+                    "count": stat["calls"],
+                    "rows": stat["rows"],
+                    "ms_total": stat["ms_total"]
+                }
+
+            return result
+
+
+def redact_value(value):
+
+    # Numbers, dates and NULLs are keys and timestamps; text can be a
+    # name, USN or password hash, so only its length is kept
+    if value is None or isinstance(value, (bool, int, float, date)):
+        return value
+
+    if isinstance(value, (str, bytes)):
+        return f"<{type(value).__name__}:{len(value)}>"
+
+    return f"<{type(value).__name__}>"
+
+
+def redact_binds(binds):
+
+    if not binds:
+        return {}
+
+    if isinstance(binds, dict):
+        return {key: redact_value(value) for key, value in binds.items()}
+
+    # executemany() row lists
+    return f"<{len(binds)} row(s)>"
+
+
+# -----------------------------
+# Repository (shared queries)
+# -----------------------------
+class Repository:
+    """Queries against one connection; subclasses supply the dialect."""
+
+    STATEMENTS = {}
+
+    # (statement name, table that must not be scanned in full)
+    PLAN_CHECKS = [
+        ("today_student_ids", "ATTENDANCE"),
+        ("usn_prefix_search", "STUDENTS"),
+        ("student_profile", "ATTENDANCE")
+    ]
+
+    # Dialect fragments for the statements built at call time
+    ROW_LIMIT = "FETCH FIRST :fetch_rows ROWS ONLY"
+    ROW_KEY = "ROWIDTOCHAR(a.ROWID)"
+    ROW_KEY_AFTER = "a.ROWID > CHARTOROWID(:cursor_rowid)"
+    ROW_KEY_BEFORE = "a.ROWID < CHARTOROWID(:cursor_rowid)"
+    USN_PREFIX_FILTER = "s.usn LIKE :usn_prefix || '%'"
+
+    def __init__(self, conn, stats):
+
+        self.conn = conn
+        self.stats = stats
+
+        # Statements sent on this connection, for per-request counts;
+        # a list in trace also collects (name, ms, rows) per statement
+        self.round_trips = 0
+        self.trace = None
+
+    def commit(self):
+
+        self.conn.commit()
+
+    def rollback(self):
+
+        self.conn.rollback()
+
+    # -----------------------------
+    # Timed execution
+    # -----------------------------
+    def _record(self, name, start, rows=0, binds=None):
+
+        self._record_elapsed(name, (time.perf_counter() - start) * 1000, rows, binds)
+
+    def _record_elapsed(self, name, elapsed_ms, rows=0, binds=None):
+
+        self.round_trips += 1
+
+        if self.trace is not None:
+            self.trace.append((name, round(elapsed_ms, 3), rows))
+
+        self.stats.record(name, elapsed_ms, rows, binds)
+
+    def _run(self, name, binds=None, sql=None, fetch="all", arraysize=None):
+
+        cur = self.conn.cursor()
+
+        if arraysize:
+            cur.arraysize = arraysize
+
+        start = time.perf_counter()
+
+        try:
+
+            cur.execute(sql or self.STATEMENTS[name], binds or {})
+
+            if fetch == "all":
+                result = cur.fetchall()
+                rows = len(result)
+            elif fetch == "one":
+                result = cur.fetchone()
+                rows = 1 if result else 0
+            else:
+                result = cur.rowcount
+                rows = max(result or 0, 0)
+
+        finally:
+
+            cur.close()
+
+        self._record(name, start, rows, binds)
+
+        return result
+
+    def _all(self, name, binds=None, sql=None, arraysize=None):
+
+        return self._run(name, binds, sql, "all", arraysize)
+
+    def _one(self, name, binds=None, sql=None):
+
+        return self._run(name, binds, sql, "one")
+
+    def _value(self, name, binds=None, sql=None):
+
+        row = self._one(name, binds, sql)
+
+        return row[0] if row else None
+
+    def _write(self, name, binds=None, sql=None):
+
+        return self._run(name, binds, sql, "none")
+
+    def _stream(self, name, binds, sql, batch_size):
+
+        # Yields fetchmany() batches; the connection must stay
+        # checked out until the generator is exhausted. Only the
+        # execute and fetch calls are timed, not the consumer's work
+        # between batches.
+        cur = self.conn.cursor()
+        cur.arraysize = batch_size
+
+        rows = 0
+        elapsed = 0.0
+
+        try:
+
+            start = time.perf_counter()
+
+            cur.execute(sql, binds)
+
+            step = time.perf_counter() - start
+            elapsed += step
+            _stream_clock.ms = stream_fetch_ms() + step * 1000
+
+            while True:
+
+                start = time.perf_counter()
+
+                batch = cur.fetchmany(batch_size)
+
+                step = time.perf_counter() - start
+                elapsed += step
+                _stream_clock.ms = stream_fetch_ms() + step * 1000
+
+                if not batch:
+                    break
+
+                rows += len(batch)
+
+                yield batch
+
+        finally:
+
+            cur.close()
+
+            self._record_elapsed(name, elapsed * 1000, rows, binds)
+
+    # -----------------------------
+    # Admins
+    # -----------------------------
+    def admin_password(self, username):
+
+        return self._value("admin_password", {"username": username})
+
+    def admin_exists(self, username):
+
+        return self._value("admin_exists", {"username": username}) > 0
+
+    def create_admin(self, username, password_hash):
+
+        self._write("create_admin", {"username": username, "password": password_hash})
+
+    # -----------------------------
+    # Students
+    # -----------------------------
+    def student_index_rows(self):
+
+        return self._all("student_index", arraysize=1000)
+
+    def student_usns(self):
+
+        return {row[0] for row in self._all("student_usns", arraysize=1000)}
+
+    def usn_taken(self, usn, exclude_id=None):
+
+        return self._value(
+            "usn_taken",
+            {"usn": usn, "exclude_id": exclude_id if exclude_id is not None else -1}
+        ) > 0
+
+    def get_student(self, student_id):
+
+        return self._one("get_student", {"student_id": student_id})
+
+    def update_student(self, student_id, name, usn, qr_code):
+
+        self._write("update_student", {
+            "student_id": student_id,
+            "name": name,
+            "usn": usn,
+            "qr_code": qr_code
+        })
+
+    def delete_student(self, student_id):
+
+        # Takes the student's marks out of the rollups, then removes
+        # attendance and the student; the caller commits
+        binds = {"student_id": student_id}
+
+        self._write("delete_student_daily", binds)
+        self._write("delete_student_monthly", binds)
+        self._write("delete_student_attendance", binds)
+        self._write("delete_student", binds)
+
+    def count_students(self):
+
+        return self._value("count_students")
+
+    def all_students(self):
+
+        return self._all("all_students", arraysize=500)
+
+    def students_page(self, fetch_rows, after=None, before=None):
+
+        # Keyset on (name, student_id); "before" walks backwards and
+        # returns rows in descending order
+        binds = {"fetch_rows": fetch_rows}
+
+        condition = ""
+        order = "ASC"
+
+        if before:
+
+            condition = (
+                "WHERE (name < :cursor_name"
+                " OR (name = :cursor_name AND student_id < :cursor_id))"
+            )
+            binds["cursor_name"], binds["cursor_id"] = before
+            order = "DESC"
+
+        elif after:
+
+            condition = (
+                "WHERE (name > :cursor_name"
+                " OR (name = :cursor_name AND student_id > :cursor_id))"
+            )
+            binds["cursor_name"], binds["cursor_id"] = after
+
+        return self._all("students_page", binds, f"""
+            SELECT
+                student_id,
+                name,
+                usn,
+                qr_code
+            FROM students
+            {condition}
+            ORDER BY name {order}, student_id {order}
+            {self.ROW_LIMIT}
+        """, arraysize=fetch_rows)
+
+    def students_by_id(self, ids):
+
+        rows = {}
+
+        # Oracle allows at most 1000 expressions in an IN list
+        for start in range(0, len(ids), 500):
+
+            chunk = ids[start:start + 500]
+
+            binds = {f"id{i}": student_id for i, student_id in enumerate(chunk)}
+            placeholders = ", ".join(f":{name}" for name in binds)
+
+            for row in self._all("students_by_id", binds, f"""
+                SELECT student_id, name, usn, qr_code
+                FROM students
+                WHERE student_id IN ({placeholders})
+            """):
+                rows[row[0]] = row
+
+        return [rows[student_id] for student_id in ids if student_id in rows]
+
+    def usn_prefix_search(self, prefix, max_rows):
+
+        return self._all(
+            "usn_prefix_search",
+            {"prefix": prefix, "max_rows": max_rows}
+        )
+
+    # -----------------------------
+    # Attendance
+    # -----------------------------
+    def today_student_ids(self):
+
+        return [row[0] for row in self._all("today_student_ids", arraysize=1000)]
+
+    def session_days(self):
+
+        return [row[0] for row in self._all("session_days", arraysize=1000)]
+
+    def dashboard_rows(self):
+
+        return self._all("dashboard")
+
+    def attendance_hwm(self):
+
+        return self._one("attendance_hwm")
+
+    def student_profile_rows(self, student_id):
+
+        return self._all("student_profile", {"student_id": student_id}, arraysize=500)
+
+    def percentage_report_rows(self):
+
+        return self._all("percentage_report", arraysize=1000)
+
+    def _attendance_conditions(self, criteria):
+
+        # criteria: from_date / to_date (inclusive days), usn_prefix,
+        # usn, status; empty values are ignored. Dates are ranges on
+        # the bare column so the date indexes apply.
+        conditions = []
+        binds = {}
+
+        if criteria.get("from_date"):
+            conditions.append("a.date_attended >= :from_date")
+            binds["from_date"] = criteria["from_date"]
+
+        if criteria.get("to_date"):
+            conditions.append("a.date_attended < :to_date")
+            binds["to_date"] = criteria["to_date"] + timedelta(days=1)
+
+        if criteria.get("usn_prefix"):
+            conditions.append(self.USN_PREFIX_FILTER)
+            binds.update(self._usn_prefix_binds(criteria["usn_prefix"]))
+
+        if criteria.get("usn"):
+            conditions.append("s.usn = :usn")
+            binds["usn"] = criteria["usn"]
+
+        if criteria.get("status"):
+            conditions.append("a.status = :status")
+            binds["status"] = criteria["status"]
+
+        return conditions, binds
+
+    def _usn_prefix_binds(self, prefix):
+
+        return {"usn_prefix": prefix}
+
+    def attendance_page(self, criteria, fetch_rows, after=None, before=None):
+
+        # Keyset on (date_attended, row key), newest first. "before"
+        # reads the newer rows in ascending order; the caller flips
+        # them. Rows end with the row key for the next cursor.
+        conditions, binds = self._attendance_conditions(criteria)
+
+        if before:
+
+            conditions.append(
+                "(a.date_attended > :cursor_date"
+                " OR (a.date_attended = :cursor_date"
+                f" AND {self.ROW_KEY_AFTER}))"
+            )
+            binds["cursor_date"], binds["cursor_rowid"] = before
+            order = "ASC"
+
+        else:
+
+            if after:
+                conditions.append(
+                    "(a.date_attended < :cursor_date"
+                    " OR (a.date_attended = :cursor_date"
+                    f" AND {self.ROW_KEY_BEFORE}))"
+                )
+                binds["cursor_date"], binds["cursor_rowid"] = after
+
+            order = "DESC"
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        binds["fetch_rows"] = fetch_rows
+
+        return self._all("attendance_page", binds, f"""
+            SELECT
+                s.name,
+                s.usn,
+                a.date_attended,
+                a.status,
+                {self.ROW_KEY}
+            FROM students s
+            JOIN attendance a
+                ON s.student_id = a.student_id
+            {where}
+            ORDER BY a.date_attended {order}, a.ROWID {order}
+            {self.ROW_LIMIT}
+        """, arraysize=fetch_rows)
+
+    def attendance_export(self, criteria, batch_size):
+
+        conditions, binds = self._attendance_conditions(criteria)
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        return self._stream("attendance_export", binds, f"""
+            SELECT
+                s.name,
+                s.usn,
+                a.date_attended,
+                a.status
+            FROM students s
+            JOIN attendance a
+                ON s.student_id = a.student_id
+            {where}
+            ORDER BY a.date_attended DESC
+        """, batch_size)
+
+    def rebuild_rollups(self):
+
+        for i, statement in enumerate(self.REBUILD_ROLLUPS):
+            self._write(f"rebuild_rollups_{i}", sql=statement)
+
+        self.commit()
+
+
+# -----------------------------
+# Oracle
+# -----------------------------
+# Date filters are written as ranges on the bare column so the
+# indexes from migrations/002_attendance_date_indexes.sql apply;
+# TRUNC() is only ever applied to SYSDATE or to a bind, never to
+# date_attended. "Today" stays anchored to the database clock so
+# it matches the SYSDATE used when marking.
+_ORACLE_TODAY_COUNT = """
+    SELECT COUNT(*)
+    FROM attendance
+    WHERE date_attended >= TRUNC(SYSDATE)
+    AND date_attended < TRUNC(SYSDATE) + 1
+"""
+
+# The USN is resolved from the app's student index, so a scan costs
+# one round trip: insert the row, bump the daily and per-student
+# monthly rollups (migrations/003_attendance_rollups.sql) and commit
+# in a single block. Duplicates are rejected by the unique
+# (student_id, attendance_day) index from
+# migrations/001_attendance_daily_unique.sql rather than by a
+# separate COUNT(*) check, so two scanners reading the same QR
+# code at once cannot both insert.
+_ORACLE_MARK_BLOCK = """
+    DECLARE
+        v_marked_at DATE := NVL(:marked_at, SYSDATE);
+        parent_missing EXCEPTION;
+        PRAGMA EXCEPTION_INIT(parent_missing, -2291);
+    BEGIN
+
+        INSERT INTO attendance
+        (student_id, date_attended, status)
+        VALUES
+        (:student_id, v_marked_at, 'Present');
+
+        BEGIN
+            MERGE INTO attendance_daily_summary d
+            USING (SELECT TRUNC(v_marked_at) AS day FROM dual) src
+            ON (d.day = src.day)
+            WHEN MATCHED THEN
+                UPDATE SET d.student_count = d.student_count + 1
+            WHEN NOT MATCHED THEN
+                INSERT (day, student_count) VALUES (src.day, 1);
+        EXCEPTION
+            -- Lost a race to create the row; it exists now
+            WHEN DUP_VAL_ON_INDEX THEN
+                UPDATE attendance_daily_summary
+                SET student_count = student_count + 1
+                WHERE day = TRUNC(v_marked_at);
+        END;
+
+        BEGIN
+            MERGE INTO attendance_monthly_student m
+            USING (
+                SELECT :student_id AS student_id,
+                       TRUNC(v_marked_at, 'MM') AS month
+                FROM dual
+            ) src
+            ON (m.student_id = src.student_id AND m.month = src.month)
+            WHEN MATCHED THEN
+                UPDATE SET m.present_count = m.present_count + 1
+            WHEN NOT MATCHED THEN
+                INSERT (student_id, month, present_count)
+                VALUES (src.student_id, src.month, 1);
+        EXCEPTION
+            WHEN DUP_VAL_ON_INDEX THEN
+                UPDATE attendance_monthly_student
+                SET present_count = present_count + 1
+                WHERE student_id = :student_id
+                AND month = TRUNC(v_marked_at, 'MM');
+        END;
+
+        {commit}
+
+        :status := 'MARKED';
+
+    EXCEPTION
+
+        WHEN DUP_VAL_ON_INDEX THEN
+            :status := 'DUPLICATE';
+
+        -- Deleted by another worker since the index was loaded
+        WHEN parent_missing THEN
+            :status := 'NOT_FOUND';
+
+    END;
+"""
+
+
+class OracleRepository(Repository):
+
+    STATEMENTS = {
+
+        "admin_password": "SELECT password FROM admins WHERE username = :username",
+
+        "admin_exists": "SELECT COUNT(*) FROM admins WHERE username = :username",
+
+        "create_admin": """
+            INSERT INTO admins (username, password)
+            VALUES (:username, :password)
+        """,
+
+        "student_index": "SELECT usn, student_id, name FROM students",
+
+        "student_usns": "SELECT usn FROM students",
+
+        "usn_taken": """
+            SELECT COUNT(*)
+            FROM students
+            WHERE usn = :usn
+            AND student_id <> :exclude_id
+        """,
+
+        "get_student": """
+            SELECT student_id, name, usn, qr_code
+            FROM students
+            WHERE student_id = :student_id
+        """,
+
+        "insert_student": """
+            INSERT INTO students
+            (student_id, name, usn, qr_code)
+            VALUES
+            (student_seq.NEXTVAL, :name, :usn, :qr_code)
+            RETURNING student_id INTO :student_id
+        """,
+
+        "insert_students": """
+            INSERT INTO students
+            (student_id, name, usn, qr_code)
+            VALUES
+            (student_seq.NEXTVAL, :name, :usn, :qr_code)
+        """,
+
+        "update_student": """
+            UPDATE students
+            SET
+                name = :name,
+                usn = :usn,
+                qr_code = :qr_code
+            WHERE student_id = :student_id
+        """,
+
+        "delete_student_daily": """
+            UPDATE attendance_daily_summary
+            SET student_count = student_count - 1
+            WHERE day IN (
+                SELECT attendance_day
+                FROM attendance
+                WHERE student_id = :student_id
+            )
+        """,
+
+        "delete_student_monthly": """
+            DELETE FROM attendance_monthly_student
+            WHERE student_id = :student_id
+        """,
+
+        "delete_student_attendance": """
+            DELETE FROM attendance
+            WHERE student_id = :student_id
+        """,
+
+        "delete_student": """
+            DELETE FROM students
+            WHERE student_id = :student_id
+        """,
+
+        "count_students": "SELECT COUNT(*) FROM students",
+
+        "all_students": """
+            SELECT student_id, name, usn, qr_code
+            FROM students
+            ORDER BY name
+        """,
+
+        # Prefix match on the normalized, indexed usn_key column
+        # (migrations/004_students_usn_key.sql)
+        "usn_prefix_search": """
+            SELECT student_id, usn_key
+            FROM students
+            WHERE usn_key LIKE :prefix || '%'
+            ORDER BY usn_key
+            FETCH FIRST :max_rows ROWS ONLY
+        """,
+
+        "today_student_ids": """
+            SELECT student_id
+            FROM attendance
+            WHERE date_attended >= TRUNC(SYSDATE)
+            AND date_attended < TRUNC(SYSDATE) + 1
+        """,
+
+        # Read from the rollups in migrations/003_attendance_rollups.sql
+        "session_days": """
+            SELECT day
+            FROM attendance_daily_summary
+            WHERE student_count > 0
+        """,
+
+        # Everything the dashboard shows in one round trip, tagged
+        # by the first column
+        "dashboard": f"""
+            SELECT
+                'totals',
+                CAST(NULL AS VARCHAR2(100)),
+                CAST(NULL AS VARCHAR2(50)),
+                CAST(NULL AS DATE),
+                CAST(NULL AS VARCHAR2(20)),
+                (SELECT COUNT(*) FROM students),
+                (SELECT NVL(SUM(student_count), 0) FROM attendance_daily_summary),
+                ({_ORACLE_TODAY_COUNT})
+            FROM dual
+
+            UNION ALL
+
+            SELECT 'recent', name, usn, date_attended, status, NULL, NULL, NULL
+            FROM (
+                SELECT
+                    s.name,
+                    s.usn,
+                    a.date_attended,
+                    a.status
+                FROM students s
+                JOIN attendance a
+                    ON s.student_id = a.student_id
+                ORDER BY a.date_attended DESC
+                FETCH FIRST 5 ROWS ONLY
+            )
+
+            UNION ALL
+
+            SELECT 'month', NULL, NULL, month, NULL, total, NULL, NULL
+            FROM (
+                SELECT
+                    TRUNC(day, 'MM') AS month,
+                    SUM(student_count) AS total
+                FROM attendance_daily_summary
+                WHERE day >= ADD_MONTHS(TRUNC(SYSDATE), -5)
+                GROUP BY TRUNC(day, 'MM')
+            )
+        """,
+
+        # Changes whenever attendance is marked or the roster is
+        # edited; versions the export cache and percentage report
+        "attendance_hwm": """
+            SELECT
+                (SELECT NVL(SUM(student_count), 0) FROM attendance_daily_summary),
+                (SELECT MAX(date_attended) FROM attendance),
+                (SELECT MAX(ORA_ROWSCN) FROM students)
+            FROM dual
+        """,
+
+        # The student row and every day the student was present,
+        # through the (student_id, attendance_day) index
+        "student_profile": """
+            SELECT 'student', s.name, s.usn, NULL
+            FROM students s
+            WHERE s.student_id = :student_id
+
+            UNION ALL
+
+            SELECT 'day', NULL, NULL, a.attendance_day
+            FROM attendance a
+            WHERE a.student_id = :student_id
+            AND a.status = 'Present'
+        """,
+
+        # One GROUP BY over the monthly rollup, with the session-day
+        # total in the same statement
+        "percentage_report": """
+            SELECT
+                s.student_id,
+                s.name,
+                s.usn,
+                NVL(SUM(m.present_count), 0),
+                (SELECT COUNT(*) FROM attendance_daily_summary WHERE student_count > 0)
+            FROM students s
+            LEFT JOIN attendance_monthly_student m
+                ON m.student_id = s.student_id
+            GROUP BY s.student_id, s.name, s.usn
+        """,
+
+        "mark_attendance": _ORACLE_MARK_BLOCK.replace("{commit}", "COMMIT;"),
+
+        # Used with executemany(); the caller commits once per batch
+        "mark_attendance_batch": _ORACLE_MARK_BLOCK.replace("{commit}", "NULL;")
+    }
+
+    REBUILD_ROLLUPS = [
+        "DELETE FROM attendance_daily_summary",
+        "DELETE FROM attendance_monthly_student",
+        """
+        INSERT INTO attendance_daily_summary (day, student_count)
+        SELECT attendance_day, COUNT(*)
+        FROM attendance
+        GROUP BY attendance_day
+        """,
+        """
+        INSERT INTO attendance_monthly_student (student_id, month, present_count)
+        SELECT student_id, TRUNC(date_attended, 'MM'), COUNT(*)
+        FROM attendance
+        WHERE status = 'Present'
+        GROUP BY student_id, TRUNC(date_attended, 'MM')
+        """
+    ]
+
+    def insert_student(self, name, usn, qr_code):
+
+        cur = self.conn.cursor()
+        student_id = cur.var(int)
+
+        start = time.perf_counter()
+
+        try:
+
+            cur.execute(self.STATEMENTS["insert_student"], {
+                "name": name,
+                "usn": usn,
+                "qr_code": qr_code,
+                "student_id": student_id
+            })
+
+        finally:
+
+            cur.close()
+
+        self._record("insert_student", start, 1, {"name": name, "usn": usn})
+
+        return student_id.getvalue()[0]
+
+    def insert_students(self, rows):
+
+        cur = self.conn.cursor()
+
+        start = time.perf_counter()
+
+        try:
+
+            cur.executemany(self.STATEMENTS["insert_students"], [
+                {"name": name, "usn": usn, "qr_code": qr_code}
+                for name, usn, qr_code in rows
+            ])
+
+        finally:
+
+            cur.close()
+
+        self._record("insert_students", start, len(rows), rows)
+
+    def mark_attendance(self, student_id, marked_at=None):
+
+        # Commits inside the block
+        cur = self.conn.cursor()
+        status = cur.var(str)
+
+        start = time.perf_counter()
+
+        try:
+
+            # Bind marked_at as a DATE even when it is None, otherwise
+            # it goes over as VARCHAR2 and NVL(:marked_at, SYSDATE)
+            # resolves to the character overload and loses the time
+            cur.setinputsizes(marked_at=oracledb.DB_TYPE_DATE)
+
+            cur.execute(
+                self.STATEMENTS["mark_attendance"],
+                student_id=student_id,
+                marked_at=marked_at,
+                status=status
+            )
+
+        finally:
+
+            cur.close()
+
+        self._record("mark_attendance", start, 1, {"student_id": student_id, "marked_at": marked_at})
+
+        return status.getvalue()
+
+    def mark_attendance_batch(self, rows):
+
+        # rows are {"student_id", "marked_at"}; one executemany() and
+        # one commit. Returns a status per row.
+        cur = self.conn.cursor()
+        status = cur.var(str, arraysize=len(rows))
+
+        start = time.perf_counter()
+
+        try:
+
+            cur.setinputsizes(
+                marked_at=oracledb.DB_TYPE_DATE,
+                status=status
+            )
+
+            cur.executemany(self.STATEMENTS["mark_attendance_batch"], rows)
+
+            self.conn.commit()
+
+        finally:
+
+            cur.close()
+
+        self._record("mark_attendance_batch", start, len(rows), rows)
+
+        return [status.getvalue(i) for i in range(len(rows))]
+
+    def explain_plan(self, name, table):
+
+        cur = self.conn.cursor()
+
+        try:
+
+            cur.execute(f"EXPLAIN PLAN SET STATEMENT_ID = '{name}' FOR {self.STATEMENTS[name]}")
+
+            cur.execute("""
+                SELECT plan_table_output
+                FROM TABLE(DBMS_XPLAN.DISPLAY('PLAN_TABLE', :1, 'BASIC'))
+            """, (name,))
+
+            plan = [row[0] for row in cur]
+
+        finally:
+
+            cur.close()
+            self.conn.rollback()
+
+        full = any(
+            "TABLE ACCESS FULL" in line and table in line
+            for line in plan
+        )
+
+        return plan, full
+
+
+def split_sql_script(script):
+
+    # Plain statements end with ";". PL/SQL blocks (BEGIN/DECLARE)
+    # end with a "/" on its own line, as in SQL*Plus.
+    statements = []
+    current = []
+    in_block = False
+
+    for line in script.splitlines():
+
+        stripped = line.strip()
+
+        if not current and (not stripped or stripped.startswith("--")):
+            continue
+
+        if not current:
+            in_block = stripped.upper().startswith(("BEGIN", "DECLARE"))
+
+        if in_block:
+
+            if stripped == "/":
+                statements.append("\n".join(current).strip())
+                current = []
+                in_block = False
+            else:
+                current.append(line)
+
+            continue
+
+        current.append(line)
+
+        if stripped.endswith(";"):
+            statements.append("\n".join(current).strip().rstrip(";"))
+            current = []
+
+    if current:
+        statements.append("\n".join(current).strip().rstrip(";"))
+
+    return statements
+
+
+class OracleBackend:
+
+    name = "oracle"
+    repository_class = OracleRepository
+
+    def __init__(self, stats):
+
+        self.stats = stats
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    @property
+    def pool(self):
+
+        if self._pool is None:
+
+            with self._pool_lock:
+
+                if self._pool is None:
+
+                    dsn = oracledb.makedsn(
+                        os.getenv("DB_HOST"),
+                        int(os.getenv("DB_PORT")),
+                        service_name=os.getenv("DB_SERVICE")
+                    )
+
+                    self._pool = oracledb.create_pool(
+                        user=os.getenv("DB_USER"),
+                        password=os.getenv("DB_PASSWORD"),
+                        dsn=dsn,
+                        min=int(os.getenv("DB_POOL_MIN", "2")),
+                        max=int(os.getenv("DB_POOL_MAX", "10")),
+                        increment=int(os.getenv("DB_POOL_INCREMENT", "1")),
+                        getmode=oracledb.POOL_GETMODE_TIMEDWAIT,
+                        wait_timeout=int(os.getenv("DB_POOL_WAIT_TIMEOUT", "5000")),
+                        ping_interval=int(os.getenv("DB_POOL_PING_INTERVAL", "60")),
+                        stmtcachesize=DB_STMT_CACHE_SIZE
+                    )
+
+        return self._pool
+
+    def connect(self):
+
+        return self.pool.acquire()
+
+    def release(self, conn):
+
+        self.pool.release(conn)
+
+    def is_pool_timeout(self, error):
+
+        if not isinstance(error, oracledb.Error):
+            return False
+
+        return getattr(error.args[0], "full_code", "") == "DPY-4005"
+
+    def pool_info(self):
+
+        pool = self.pool
+
+        return {
+            "backend": self.name,
+            "min": pool.min,
+            "max": pool.max,
+            "increment": pool.increment,
+            "open": pool.opened,
+            "busy": pool.busy,
+            "idle": pool.opened - pool.busy,
+            "wait_timeout_ms": pool.wait_timeout,
+            "ping_interval_s": pool.ping_interval,
+            "stmt_cache_size": pool.stmtcachesize
+        }
+
+    def repository(self, conn):
+
+        return self.repository_class(conn, self.stats)
+
+    @contextmanager
+    def session(self):
+
+        conn = self.connect()
+
+        try:
+            yield self.repository(conn)
+        finally:
+            self.release(conn)
+
+    def migrate(self):
+
+        applied = []
+
+        with self.session() as repo:
+
+            cur = repo.conn.cursor()
+
+            cur.execute("""
+                SELECT COUNT(*)
+                FROM user_tables
+                WHERE table_name = 'SCHEMA_MIGRATIONS'
+            """)
+
+            if cur.fetchone()[0] == 0:
+
+                cur.execute("""
+                    CREATE TABLE schema_migrations (
+                        version    VARCHAR2(200) PRIMARY KEY,
+                        applied_at DATE DEFAULT SYSDATE NOT NULL
+                    )
+                """)
+
+            cur.execute("SELECT version FROM schema_migrations")
+
+            done = {row[0] for row in cur}
+
+            for filename in sorted(os.listdir(MIGRATIONS_DIR)):
+
+                if not filename.endswith(".sql") or filename in done:
+                    continue
+
+                with open(os.path.join(MIGRATIONS_DIR, filename)) as f:
+                    statements = split_sql_script(f.read())
+
+                # DDL commits implicitly, so a migration is recorded
+                # only after every statement in it has succeeded
+                for statement in statements:
+                    cur.execute(statement)
+
+                cur.execute(
+                    "INSERT INTO schema_migrations (version) VALUES (:1)",
+                    (filename,)
+                )
+
+                repo.commit()
+
+                applied.append(filename)
+
+        return applied
+
+
+# -----------------------------
+# SQLite
+# -----------------------------
+# Same tables, virtual columns and indexes as the Oracle schema
+# after migrations 001-005. Dates are stored as ISO text
+# ("YYYY-MM-DD HH:MM:SS") and come back as datetime, like Oracle
+# DATE; expressions are tagged "[timestamp]" for the converter.
+# roster_version stands in for ORA_ROWSCN in attendance_hwm.
+SQLITE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS admins (
+        admin_id INTEGER PRIMARY KEY,
+        username TEXT NOT NULL UNIQUE,
+        password TEXT NOT NULL
+    );
+
+    CREATE TABLE IF NOT EXISTS students (
+        student_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name       TEXT NOT NULL,
+        usn        TEXT NOT NULL UNIQUE,
+        qr_code    TEXT,
+        usn_key    TEXT GENERATED ALWAYS AS (
+            upper(replace(replace(usn, ' ', ''), '-', ''))
+        ) VIRTUAL
+    );
+
+    CREATE INDEX IF NOT EXISTS students_usn_key_idx
+        ON students (usn_key);
+
+    CREATE INDEX IF NOT EXISTS students_name_idx
+        ON students (name, student_id);
+
+    CREATE TABLE IF NOT EXISTS attendance (
+        attendance_id  INTEGER PRIMARY KEY,
+        student_id     INTEGER NOT NULL REFERENCES students (student_id),
+        date_attended  TIMESTAMP NOT NULL,
+        status         TEXT NOT NULL,
+        attendance_day DATE GENERATED ALWAYS AS (date(date_attended)) VIRTUAL
+    );
+
+    CREATE UNIQUE INDEX IF NOT EXISTS attendance_student_day_uk
+        ON attendance (student_id, attendance_day);
+
+    CREATE INDEX IF NOT EXISTS attendance_date_idx
+        ON attendance (date_attended);
+
+    CREATE INDEX IF NOT EXISTS attendance_student_date_idx
+        ON attendance (student_id, date_attended);
+
+    CREATE INDEX IF NOT EXISTS attendance_day_idx
+        ON attendance (attendance_day);
+
+    CREATE TABLE IF NOT EXISTS attendance_daily_summary (
+        day           DATE PRIMARY KEY,
+        student_count INTEGER DEFAULT 0 NOT NULL
+    );
+
+    CREATE TABLE IF NOT EXISTS attendance_monthly_student (
+        student_id    INTEGER NOT NULL,
+        month         DATE NOT NULL,
+        present_count INTEGER DEFAULT 0 NOT NULL,
+        PRIMARY KEY (student_id, month)
+    );
+
+    CREATE TABLE IF NOT EXISTS roster_version (
+        version INTEGER NOT NULL
+    );
+
+    INSERT INTO roster_version (version)
+    SELECT 0
+    WHERE NOT EXISTS (SELECT 1 FROM roster_version);
+
+    CREATE TRIGGER IF NOT EXISTS students_roster_insert
+    AFTER INSERT ON students
+    BEGIN
+        UPDATE roster_version SET version = version + 1;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS students_roster_update
+    AFTER UPDATE ON students
+    BEGIN
+        UPDATE roster_version SET version = version + 1;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS students_roster_delete
+    AFTER DELETE ON students
+    BEGIN
+        UPDATE roster_version SET version = version + 1;
+    END;
+"""
+
+_SQLITE_TODAY = "date('now', 'localtime')"
+_SQLITE_TOMORROW = "date('now', 'localtime', '+1 day')"
+
+
+def _sqlite_datetime(value):
+
+    text = value.decode()
+
+    if len(text) == 10:
+        return datetime.strptime(text, "%Y-%m-%d")
+
+    return datetime.fromisoformat(text)
+
+
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(" ", "seconds"))
+sqlite3.register_adapter(date, lambda value: value.isoformat())
+sqlite3.register_converter("timestamp", _sqlite_datetime)
+sqlite3.register_converter("date", _sqlite_datetime)
+
+
+class SQLiteRepository(Repository):
+
+    ROW_LIMIT = "LIMIT :fetch_rows"
+    ROW_KEY = "CAST(a.ROWID AS TEXT)"
+    ROW_KEY_AFTER = "a.ROWID > CAST(:cursor_rowid AS INTEGER)"
+    ROW_KEY_BEFORE = "a.ROWID < CAST(:cursor_rowid AS INTEGER)"
+    # SQLite only turns LIKE into an index range for a literal
+    # pattern, so the class filter is written as the range itself
+    USN_PREFIX_FILTER = "s.usn >= :usn_prefix AND s.usn < :usn_prefix_upper"
+
+    STATEMENTS = {
+
+        **OracleRepository.STATEMENTS,
+
+        "insert_student": """
+            INSERT INTO students
+            (name, usn, qr_code)
+            VALUES
+            (:name, :usn, :qr_code)
+        """,
+
+        "insert_students": """
+            INSERT INTO students
+            (name, usn, qr_code)
+            VALUES
+            (:name, :usn, :qr_code)
+        """,
+
+        # A prefix as a half-open range on the bare column, so SQLite
+        # range-scans students_usn_key_idx; LIKE/GLOB with an
+        # expression on the right-hand side scan the whole index
+        "usn_prefix_search": """
+            SELECT student_id, usn_key
+            FROM students
+            WHERE usn_key >= :prefix
+            AND usn_key < :prefix_upper
+            ORDER BY usn_key
+            LIMIT :max_rows
+        """,
+
+        "today_student_ids": f"""
+            SELECT student_id
+            FROM attendance
+            WHERE date_attended >= {_SQLITE_TODAY}
+            AND date_attended < {_SQLITE_TOMORROW}
+        """,
+
+        "dashboard": f"""
+            SELECT
+                'totals',
+                NULL,
+                NULL,
+                NULL AS "when [timestamp]",
+                NULL,
+                (SELECT COUNT(*) FROM students),
+                (SELECT COALESCE(SUM(student_count), 0) FROM attendance_daily_summary),
+                (
+                    SELECT COUNT(*)
+                    FROM attendance
+                    WHERE date_attended >= {_SQLITE_TODAY}
+                    AND date_attended < {_SQLITE_TOMORROW}
+                )
+
+            UNION ALL
+
+            SELECT * FROM (
+                SELECT 'recent', s.name, s.usn, a.date_attended, a.status, NULL, NULL, NULL
+                FROM students s
+                JOIN attendance a
+                    ON s.student_id = a.student_id
+                ORDER BY a.date_attended DESC
+                LIMIT 5
+            )
+
+            UNION ALL
+
+            SELECT 'month', NULL, NULL, month, NULL, SUM(student_count), NULL, NULL
+            FROM (
+                SELECT strftime('%Y-%m-01', day) AS month, student_count
+                FROM attendance_daily_summary
+                WHERE day >= date('now', 'localtime', '-5 months')
+            )
+            GROUP BY month
+        """,
+
+        "attendance_hwm": """
+            SELECT
+                (SELECT COALESCE(SUM(student_count), 0) FROM attendance_daily_summary),
+                (SELECT MAX(date_attended) FROM attendance) AS "last [timestamp]",
+                (SELECT version FROM roster_version)
+        """,
+
+        "student_profile": """
+            SELECT 'student', s.name, s.usn, NULL AS "day [timestamp]"
+            FROM students s
+            WHERE s.student_id = :student_id
+
+            UNION ALL
+
+            SELECT 'day', NULL, NULL, a.attendance_day
+            FROM attendance a
+            WHERE a.student_id = :student_id
+            AND a.status = 'Present'
+        """,
+
+        "percentage_report": """
+            SELECT
+                s.student_id,
+                s.name,
+                s.usn,
+                COALESCE(SUM(m.present_count), 0),
+                (SELECT COUNT(*) FROM attendance_daily_summary WHERE student_count > 0)
+            FROM students s
+            LEFT JOIN attendance_monthly_student m
+                ON m.student_id = s.student_id
+            GROUP BY s.student_id, s.name, s.usn
+        """,
+
+        "mark_insert": """
+            INSERT INTO attendance
+            (student_id, date_attended, status)
+            VALUES
+            (:student_id, :marked_at, 'Present')
+        """,
+
+        "mark_daily": """
+            INSERT INTO attendance_daily_summary (day, student_count)
+            VALUES (date(:marked_at), 1)
+            ON CONFLICT (day) DO UPDATE
+            SET student_count = student_count + 1
+        """,
+
+        "mark_monthly": """
+            INSERT INTO attendance_monthly_student (student_id, month, present_count)
+            VALUES (:student_id, strftime('%Y-%m-01', :marked_at), 1)
+            ON CONFLICT (student_id, month) DO UPDATE
+            SET present_count = present_count + 1
+        """
+    }
+
+    REBUILD_ROLLUPS = [
+        "DELETE FROM attendance_daily_summary",
+        "DELETE FROM attendance_monthly_student",
+        """
+        INSERT INTO attendance_daily_summary (day, student_count)
+        SELECT attendance_day, COUNT(*)
+        FROM attendance
+        GROUP BY attendance_day
+        """,
+        """
+        INSERT INTO attendance_monthly_student (student_id, month, present_count)
+        SELECT student_id, strftime('%Y-%m-01', date_attended), COUNT(*)
+        FROM attendance
+        WHERE status = 'Present'
+        GROUP BY student_id, strftime('%Y-%m-01', date_attended)
+        """
+    ]
+
+    def insert_student(self, name, usn, qr_code):
+
+        cur = self.conn.cursor()
+
+        start = time.perf_counter()
+
+        try:
+
+            cur.execute(self.STATEMENTS["insert_student"], {
+                "name": name,
+                "usn": usn,
+                "qr_code": qr_code
+            })
+
+            student_id = cur.lastrowid
+
+        finally:
+
+            cur.close()
+
+        self._record("insert_student", start, 1, {"name": name, "usn": usn})
+
+        return student_id
+
+    def insert_students(self, rows):
+
+        start = time.perf_counter()
+
+        self.conn.executemany(self.STATEMENTS["insert_students"], [
+            {"name": name, "usn": usn, "qr_code": qr_code}
+            for name, usn, qr_code in rows
+        ])
+
+        self._record("insert_students", start, len(rows), rows)
+
+    def usn_prefix_search(self, prefix, max_rows):
+
+        # Upper bound: the prefix with its last character bumped
+        return self._all("usn_prefix_search", {
+            "prefix": prefix,
+            "prefix_upper": prefix[:-1] + chr(ord(prefix[-1]) + 1),
+            "max_rows": max_rows
+        })
+
+    def _usn_prefix_binds(self, prefix):
+
+        return {
+            "usn_prefix": prefix,
+            "usn_prefix_upper": prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        }
+
+    def _mark(self, cur, student_id, marked_at):
+
+        # A failed INSERT only rolls back that statement, so a batch
+        # carries on past duplicates inside one transaction
+        binds = {
+            "student_id": student_id,
+            "marked_at": marked_at or datetime.now().replace(microsecond=0)
+        }
+
+        try:
+
+            cur.execute(self.STATEMENTS["mark_insert"], binds)
+
+        except sqlite3.IntegrityError as e:
+
+            if "FOREIGN KEY" in str(e):
+                return MARK_NOT_FOUND
+
+            return MARK_DUPLICATE
+
+        cur.execute(self.STATEMENTS["mark_daily"], binds)
+        cur.execute(self.STATEMENTS["mark_monthly"], binds)
+
+        return MARK_MARKED
+
+    def mark_attendance(self, student_id, marked_at=None):
+
+        cur = self.conn.cursor()
+
+        start = time.perf_counter()
+
+        try:
+
+            status = self._mark(cur, student_id, marked_at)
+            self.conn.commit()
+
+        finally:
+
+            cur.close()
+
+        self._record("mark_attendance", start, 1, {"student_id": student_id, "marked_at": marked_at})
+
+        return status
+
+    def mark_attendance_batch(self, rows):
+
+        cur = self.conn.cursor()
+
+        start = time.perf_counter()
+
+        try:
+
+            statuses = [
+                self._mark(cur, row["student_id"], row["marked_at"])
+                for row in rows
+            ]
+
+            self.conn.commit()
+
+        finally:
+
+            cur.close()
+
+        self._record("mark_attendance_batch", start, len(rows), rows)
+
+        return statuses
+
+    def explain_plan(self, name, table):
+
+        sql = self.STATEMENTS[name]
+
+        # EXPLAIN QUERY PLAN needs every parameter bound
+        binds = {
+            param: None
+            for param in ("student_id", "prefix", "prefix_upper", "max_rows")
+            if f":{param}" in sql
+        }
+
+        plan = [
+            row[3]
+            for row in self.conn.execute(f"EXPLAIN QUERY PLAN {sql}", binds)
+        ]
+
+        # Any SCAN of the table (by name or alias) reads all of it or
+        # all of an index on it; only SEARCH is a range/key lookup
+        names = {table.lower()} | {
+            alias.lower()
+            for alias in re.findall(
+                rf"\b{table}\s+(?:AS\s+)?(\w+)",
+                sql,
+                re.IGNORECASE
+            )
+        }
+
+        full = any(
+            line.split()[:1] == ["SCAN"] and line.split()[1].lower() in names
+            for line in plan
+        )
+
+        return plan, full
+
+
+class SQLiteBackend:
+
+    name = "sqlite"
+    repository_class = SQLiteRepository
+
+    def __init__(self, stats):
+
+        self.stats = stats
+        self.path = os.getenv(
+            "SQLITE_PATH",
+            os.path.join(os.path.dirname(os.path.abspath(__file__)), "instance", "attendance.db")
+        )
+
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+        self._opened = 0
+
+    def connect(self):
+
+        # One long-lived connection per thread keeps each thread's
+        # prepared statement cache warm across requests
+        conn = getattr(self._local, "conn", None)
+
+        if conn is None:
+
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+
+            conn = sqlite3.connect(
+                self.path,
+                timeout=int(os.getenv("DB_POOL_WAIT_TIMEOUT", "5000")) / 1000,
+                detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES,
+                cached_statements=DB_STMT_CACHE_SIZE
+            )
+
+            conn.execute("PRAGMA foreign_keys = ON")
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+
+            with self._schema_lock:
+
+                if not self._schema_ready:
+                    conn.executescript(SQLITE_SCHEMA)
+                    self._schema_ready = True
+
+                self._opened += 1
+
+            self._local.conn = conn
+
+        return conn
+
+    def release(self, conn):
+
+        # Kept open for the thread's next request
+        if conn.in_transaction:
+            conn.rollback()
+
+    def is_pool_timeout(self, error):
+
+        return False
+
+    def pool_info(self):
+
+        return {
+            "backend": self.name,
+            "path": self.path,
+            "open": self._opened,
+            "stmt_cache_size": DB_STMT_CACHE_SIZE
+        }
+
+    def repository(self, conn):
+
+        return self.repository_class(conn, self.stats)
+
+    @contextmanager
+    def session(self):
+
+        conn = self.connect()
+
+        try:
+            yield self.repository(conn)
+        finally:
+            self.release(conn)
+
+    def migrate(self):
+
+        # The schema is created on first connect
+        self.connect()
+
+        return []
+
+
+BACKENDS = {
+    "oracle": OracleBackend,
+    "sqlite": SQLiteBackend
+}
+
+
+def create_backend(name=None, stats=None):
+
+    name = (name or os.getenv("DB_BACKEND", "oracle")).lower()
+
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown DB_BACKEND {name!r}; expected one of {', '.join(BACKENDS)}")
+
+    return BACKENDS[name](stats or QueryStats())